@@ -9,12 +9,14 @@ package.domain = org.example
 source.dir = .
 source.include_exts = py,png,jpg,kv,atlas,txt
 source.main = word_highlighter_android.py
+source.exclude_dirs = tools, bin
+source.exclude_patterns = word_highlighter_cli.py
 
 # 版本
 version = 1.0.0
 
 # Python 依赖（简化版，避免编译问题）
-requirements = python3,kivy==2.1.0,requests,beautifulsoup4,html5lib
+requirements = python3,kivy==2.1.0,requests,sqlite3
 
 # Android 配置
 android.permissions = INTERNET,READ_EXTERNAL_STORAGE,WRITE_EXTERNAL_STORAGE
@@ -0,0 +1,88 @@
+"""
+网页正文提取基准 - 对比 html_to_text 与原先的 BeautifulSoup 路径
+
+用法:
+    python tools/bench_html_extract.py
+    python tools/bench_html_extract.py page1.html page2.html --repeat 5
+    python tools/bench_html_extract.py --synthetic 20000
+
+没有指定文件时生成一个含导航、脚本和样式的合成网页；
+分别统计解析耗时（取多次运行的最小值）和 tracemalloc 记录的内存峰值。
+未安装 bs4 时只测量 html_to_text。
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from word_highlighter_core import html_to_text  # noqa: E402
+
+
+def synthetic_page(paragraphs):
+    """生成带有大量非正文元素的测试网页"""
+    parts = ['<html><head><title>bench</title><style>body { font: 14px serif; }</style></head><body>']
+    parts.append('<nav><ul>' + ''.join(f'<li><a href="/{i}">link {i}</a></li>' for i in range(200)) + '</ul></nav>')
+    for i in range(paragraphs):
+        parts.append(f'<p>Paragraph {i}: the <b>quick</b> brown fox jumps over the <i>lazy</i> dog &amp; runs away.</p>')
+        if i % 50 == 0:
+            parts.append(f'<script>var data{i} = "{"x" * 500}";</script>')
+    parts.append('<footer>copyright</footer></body></html>')
+    return ''.join(parts)
+
+
+def extract_with_beautifulsoup(html):
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(html, 'html.parser').get_text()
+
+
+def measure(func, html, repeat):
+    """返回 (最短耗时秒, 内存峰值字节, 输出字符数)"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(html)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    text = func(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, len(text)
+
+
+def report(name, html, repeat):
+    print(f'{name}（{len(html) / 1024:.0f} KB）')
+    print(f'  {"方法":<18}{"耗时(ms)":>10}{"内存峰值(MB)":>14}{"输出字符":>10}')
+    methods = [('html_to_text', html_to_text)]
+    try:
+        import bs4  # noqa: F401
+        methods.append(('BeautifulSoup', extract_with_beautifulsoup))
+    except ImportError:
+        print('  （未安装 bs4，跳过 BeautifulSoup）')
+    for label, func in methods:
+        elapsed, peak, chars = measure(func, html, repeat)
+        print(f'  {label:<18}{elapsed * 1000:>10.1f}{peak / 1024 / 1024:>14.1f}{chars:>10}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='对比网页正文提取的耗时和内存')
+    parser.add_argument('files', nargs='*', help='要测量的 HTML 文件')
+    parser.add_argument('--synthetic', type=int, default=5000, help='合成网页的段落数（未指定文件时使用）')
+    parser.add_argument('--repeat', type=int, default=3, help='每种方法的重复次数')
+    args = parser.parse_args()
+
+    if args.files:
+        for path in args.files:
+            with open(path, 'r', encoding='utf-8', errors='replace') as file:
+                report(path, file.read(), args.repeat)
+    else:
+        report(f'合成网页 {args.synthetic} 段', synthetic_page(args.synthetic), args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+启动耗时基准 - 基于 python -X importtime 统计导入耗时
+
+用法:
+    python tools/bench_startup.py
+    python tools/bench_startup.py --top 30 --extra spacy requests bs4 googletrans
+
+在独立子进程中以 -X importtime 导入主模块，按顶层包汇总自身耗时；
+--extra 中的模块单独测量，用于对比这些延迟导入的模块原本会计入启动的耗时。
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_EXTRA = ['spacy', 'requests', 'bs4', 'googletrans']
+
+
+def measure(module):
+    """在新进程中导入 module，返回 (记录列表, 错误信息)
+
+    记录格式为 (模块名, 自身耗时us, 累计耗时us)。
+    """
+    env = dict(os.environ, KIVY_NO_ARGS='1', KIVY_NO_CONSOLELOG='1')
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    rows = []
+    other = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:'):
+            other.append(line)
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        rows.append((parts[2].strip(), int(parts[0]), int(parts[1])))
+    error = None
+    if proc.returncode != 0:
+        error = other[-1] if other else f'退出码 {proc.returncode}'
+    return rows, error
+
+
+def report_module(module, top):
+    """输出主模块的导入耗时分布"""
+    rows, error = measure(module)
+    if error:
+        print(f'导入 {module} 失败: {error}')
+        return
+    by_package = defaultdict(int)
+    for name, self_us, _ in rows:
+        by_package[name.split('.')[0]] += self_us
+    total = sum(by_package.values())
+    print(f'导入 {module} 总耗时: {total / 1000:.1f} ms（{len(rows)} 个模块）')
+    print(f'{"顶层包":<24}{"耗时(ms)":>10}{"占比":>8}')
+    for package, us in sorted(by_package.items(), key=lambda item: -item[1])[:top]:
+        print(f'{package:<24}{us / 1000:>10.1f}{us / total:>8.1%}')
+
+
+def report_extra(modules):
+    """单独测量延迟导入的模块"""
+    print()
+    print('延迟导入的模块（启动时不再加载）:')
+    saved = 0
+    for module in modules:
+        rows, error = measure(module)
+        if error:
+            print(f'  {module:<20}未安装或导入失败（{error}）')
+            continue
+        cumulative = next((cum for name, _, cum in reversed(rows) if name == module), 0)
+        saved += cumulative
+        print(f'  {module:<20}{cumulative / 1000:>10.1f} ms')
+    print(f'  {"合计":<20}{saved / 1000:>10.1f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='统计应用启动时的模块导入耗时')
+    parser.add_argument('--module', default='word_highlighter_android', help='要测量的主模块')
+    parser.add_argument('--top', type=int, default=20, help='显示耗时最多的前 N 个顶层包')
+    parser.add_argument('--extra', nargs='*', default=DEFAULT_EXTRA, help='单独测量的延迟导入模块')
+    args = parser.parse_args()
+
+    report_module(args.module, args.top)
+    if args.extra:
+        report_extra(args.extra)
+
+
+if __name__ == '__main__':
+    main()
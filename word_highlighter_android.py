@@ -5,8 +5,6 @@
 
 from kivy.app import App
 from kivy.uix.boxlayout import BoxLayout
-from kivy.uix.gridlayout import GridLayout
-from kivy.uix.scrollview import ScrollView
 from kivy.uix.label import Label
 from kivy.uix.button import Button
 from kivy.uix.textinput import TextInput
@@ -24,16 +22,19 @@ from kivy.core.window import Window
 from kivy.core.text import LabelBase
 from kivy.clock import Clock, mainthread
 from kivy.utils import platform
-from kivy.uix.filechooser import FileChooserListView
 
-import spacy
-import threading
 import os
-import sys
 import time
 import re
-import requests
-from bs4 import BeautifulSoup
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+
+from word_highlighter_core import (
+    HighlightDocument, JobScheduler, MappedTextDocument, MarkupRenderer, ParallelHighlighter,
+    TEXT_ENCODINGS, ProgressReporter, TextFileSource, WebFetcher, WordBank, detect_encoding,
+    get_translator, split_long_paragraph, translator_available
+)
 
 # 文件选择器 - Android 兼容
 if platform == 'android':
@@ -45,200 +46,6 @@ if platform == 'android':
         Permission.WRITE_EXTERNAL_STORAGE,
         Permission.INTERNET
     ])
-else:
-    from kivy.uix.filechooser import FileChooserListView
-
-# 翻译功能
-try:
-    from googletrans import Translator as GoogleTranslator
-    translator = GoogleTranslator()
-    _TRANSLATOR_AVAILABLE = True
-except Exception:
-    translator = None
-    _TRANSLATOR_AVAILABLE = False
-
-
-class WordBank:
-    """词库管理类"""
-    def __init__(self, show_error_callback=None):
-        """初始化词库和 spaCy 词形还原器"""
-        self.show_error_callback = show_error_callback
-        try:
-            # 获取应用数据路径
-            if platform == 'android':
-                from android.storage import app_storage_path
-                base_path = app_storage_path()
-            elif getattr(sys, 'frozen', False):
-                base_path = sys._MEIPASS
-            else:
-                base_path = os.path.dirname(os.path.abspath(__file__))
-            
-            model_path = os.path.join(base_path, "en_core_web_sm")
-            
-            # 如果模型不存在，使用简化的词形还原
-            if not os.path.exists(model_path):
-                print(f"警告: 模型文件夹不存在: {model_path}，使用简化模式")
-                self.nlp = None
-                if self.show_error_callback:
-                    self.show_error_callback("提示", "未找到 spaCy 模型，将使用简化的词形还原功能")
-            else:
-                self.nlp = spacy.load(model_path)
-        except Exception as e:
-            print(f"加载模型出错: {e}")
-            self.nlp = None
-            if self.show_error_callback:
-                self.show_error_callback("错误", f"加载模型出错: {e}\n将使用简化模式")
-        
-        self.words = set()
-
-    def add_word(self, word):
-        """添加单词到词库"""
-        word = word.lower().strip()
-        if not word:
-            return None
-        self.words.add(word)
-        return word
-
-    def remove_word(self, word):
-        """从词库移除单词"""
-        word = word.lower().strip()
-        if word in self.words:
-            self.words.remove(word)
-            return True
-        return False
-
-    def normalize_word(self, word):
-        """词形还原"""
-        word = word.lower()
-        if self.nlp:
-            doc = self.nlp(word)
-            return doc[0].lemma_ if doc else word
-        else:
-            # 改进的词形还原（回退模式）
-            return self._fallback_lemmatize(word)
-    
-    def _fallback_lemmatize(self, word):
-        """改进的回退词形还原（无spaCy时使用）"""
-        # 常见不规则动词
-        irregular_verbs = {
-            'was': 'be', 'were': 'be', 'been': 'be', 'being': 'be',
-            'had': 'have', 'has': 'have', 'having': 'have',
-            'did': 'do', 'does': 'do', 'done': 'do', 'doing': 'do',
-            'went': 'go', 'goes': 'go', 'gone': 'go', 'going': 'go',
-            'came': 'come', 'comes': 'come', 'coming': 'come',
-            'saw': 'see', 'sees': 'see', 'seen': 'see', 'seeing': 'see',
-            'got': 'get', 'gets': 'get', 'gotten': 'get', 'getting': 'get',
-            'took': 'take', 'takes': 'take', 'taken': 'take', 'taking': 'take',
-            'made': 'make', 'makes': 'make', 'making': 'make',
-            'said': 'say', 'says': 'say', 'saying': 'say',
-            'told': 'tell', 'tells': 'tell', 'telling': 'tell',
-            'knew': 'know', 'knows': 'know', 'known': 'know', 'knowing': 'know',
-            'thought': 'think', 'thinks': 'think', 'thinking': 'think',
-            'felt': 'feel', 'feels': 'feel', 'feeling': 'feel',
-            'found': 'find', 'finds': 'find', 'finding': 'find',
-            'gave': 'give', 'gives': 'give', 'given': 'give', 'giving': 'give',
-            'ran': 'run', 'runs': 'run', 'running': 'run',
-            'wrote': 'write', 'writes': 'write', 'written': 'write', 'writing': 'write',
-        }
-        
-        if word in irregular_verbs:
-            return irregular_verbs[word]
-        
-        # -ing 结尾
-        if word.endswith('ing') and len(word) > 5:
-            # running -> run (双写辅音)
-            if len(word) > 6 and word[-4] == word[-5] and word[-4] not in 'aeiou':
-                return word[:-4]
-            # making -> make
-            base = word[:-3]
-            if len(base) >= 3:
-                # 尝试加e
-                if base[-1] not in 'aeiou' and len(base) >= 2 and base[-2] in 'aeiou':
-                    return base + 'e'
-                return base
-        
-        # -ed 结尾
-        elif word.endswith('ed') and len(word) > 4:
-            # succeeded -> succeed (eed结尾)
-            if word.endswith('eed') and len(word) > 5:
-                return word[:-2]  # 去掉 'ed' 而不是 'd'
-            # stopped -> stop (双写辅音)
-            if len(word) > 5 and word[-3] == word[-4] and word[-3] not in 'aeiou':
-                return word[:-3]
-            # fired -> fire, loved -> love
-            base = word[:-2]
-            if len(base) >= 2 and base[-1] not in 'aeiou' and base[-2] in 'aeiou':
-                return base + 'e'
-            return base
-        
-        # -s 结尾（复数/第三人称单数）
-        elif word.endswith('s') and len(word) > 3 and not word.endswith('ss'):
-            # cities -> city
-            if word.endswith('ies') and len(word) > 4:
-                return word[:-3] + 'y'
-            # boxes -> box, classes -> class
-            elif word.endswith('es'):
-                base = word[:-2]
-                if base.endswith(('s', 'sh', 'ch', 'x', 'z')):
-                    return base
-                return word[:-1]
-            # cats -> cat
-            return word[:-1]
-        
-        return word
-
-    def highlight_words(self, text):
-        """高亮文本中的词库单词"""
-        if self.nlp:
-            doc = self.nlp(text)
-            result = []
-            last_end = 0
-            for token in doc:
-                if token.is_alpha:
-                    start, end = token.idx, token.idx + len(token.text)
-                    result.append((text[last_end:start], "normal", None))
-                    lemma = token.lemma_.lower()
-                    if lemma in self.words:
-                        result.append((token.text, "highlight", lemma))
-                    else:
-                        result.append((token.text, "normal", None))
-                    last_end = end
-            result.append((text[last_end:], "normal", None))
-            return result
-        else:
-            # 简化模式：按空格分词
-            result = []
-            words = re.findall(r'\b\w+\b|\W+', text)
-            for word in words:
-                if word.strip() and word.isalpha():
-                    lemma = self.normalize_word(word)
-                    if lemma in self.words:
-                        result.append((word, "highlight", lemma))
-                    else:
-                        result.append((word, "normal", None))
-                else:
-                    result.append((word, "normal", None))
-            return result
-
-    def save_word_bank(self, filepath):
-        """保存词库到文件"""
-        try:
-            with open(filepath, 'w', encoding='utf-8') as file:
-                file.write('\n'.join(sorted(self.words)))
-            return True
-        except Exception as e:
-            print(f"保存词库出错: {e}")
-            return False
-
-    def load_word_bank(self, filepath):
-        """从文件加载词库"""
-        try:
-            with open(filepath, 'r', encoding='utf-8') as file:
-                self.words = {line.strip().lower() for line in file if line.strip()}
-            return True
-        except Exception as e:
-            print(f"加载词库出错: {e}")
-            return False
 
 
 class SelectableRecycleBoxLayout(FocusBehavior, LayoutSelectionBehavior, RecycleBoxLayout):
@@ -246,28 +53,34 @@ class SelectableRecycleBoxLayout(FocusBehavior, LayoutSelectionBehavior, Recycle
     pass
 
 
-class WordListItem(BoxLayout):
-    """词库列表项 - 简化版本"""
-    def __init__(self, word, remove_callback, **kwargs):
+class WordListItem(RecycleDataViewBehavior, BoxLayout):
+    """词库列表项 - RecycleView 复用的行视图"""
+    word = StringProperty('')
+    remove_callback = ObjectProperty(None, allownone=True)
+    selected = BooleanProperty(False)
+    selectable = BooleanProperty(True)
+
+    NORMAL_COLOR = (0.95, 0.95, 0.95, 1)  # 浅灰背景
+    SELECTED_COLOR = (1, 1, 0.7, 1)  # 黄色高亮
+
+    def __init__(self, **kwargs):
         super(WordListItem, self).__init__(**kwargs)
-        self.word = word
+        self.index = None
         self.orientation = 'horizontal'
-        self.size_hint_y = None
-        self.height = 45
         self.padding = [5, 2, 5, 2]
         self.spacing = 5
         
         # 添加背景
         from kivy.graphics import Color, Rectangle
         with self.canvas.before:
-            Color(0.95, 0.95, 0.95, 1)  # 浅灰背景
+            self.bg_color = Color(*self.NORMAL_COLOR)
             self.bg_rect = Rectangle(pos=self.pos, size=self.size)
         self.bind(pos=self._update_bg, size=self._update_bg)
         
         # 单词标签
         self.word_label = Label(
-            text=word, 
-            size_hint_x=0.75, 
+            text=self.word,
+            size_hint_x=0.75,
             font_name='Chinese',
             color=(0.1, 0.1, 0.1, 1),  # 深灰色文字
             font_size='18sp',
@@ -275,31 +88,281 @@ class WordListItem(BoxLayout):
             valign='middle',
             text_size=(None, None)
         )
+        self.bind(word=self.word_label.setter('text'))
         self.add_widget(self.word_label)
         
         # 删除按钮
         remove_btn = Button(
-            text='删除', 
-            size_hint_x=0.25, 
-            font_name='Chinese', 
+            text='删除',
+            size_hint_x=0.25,
+            font_name='Chinese',
             background_color=(0.9, 0.3, 0.3, 1),
             font_size='16sp'
         )
-        remove_btn.bind(on_press=lambda x: remove_callback(word))
+        remove_btn.bind(on_press=self._on_remove)
         self.add_widget(remove_btn)
     
+    def refresh_view_attrs(self, rv, index, data):
+        """复用视图时更新行数据"""
+        self.index = index
+        return super(WordListItem, self).refresh_view_attrs(rv, index, data)
+    
+    def on_touch_down(self, touch):
+        """点击行时选中"""
+        if super(WordListItem, self).on_touch_down(touch):
+            return True
+        if self.collide_point(*touch.pos) and self.selectable:
+            return self.parent.select_with_touch(self.index, touch)
+        return False
+    
+    def apply_selection(self, rv, index, is_selected):
+        """选中状态变化时切换背景色"""
+        self.selected = is_selected
+    
+    def on_selected(self, instance, value):
+        self.bg_color.rgba = self.SELECTED_COLOR if value else self.NORMAL_COLOR
+    
+    def _on_remove(self, instance):
+        if self.remove_callback:
+            self.remove_callback(self.word)
+    
     def _update_bg(self, *args):
         """更新背景"""
         self.bg_rect.pos = self.pos
         self.bg_rect.size = self.size
 
 
+class WordListView(RecycleView):
+    """词库列表 - 数据驱动，只为可见行创建控件
+
+    单词按页从词库存储读取，滚动接近底部时追加下一页，不把整个词库读入内存。
+    """
+    ROW_HEIGHT = 45
+    ROW_SPACING = 3
+    PADDING = 5
+    PAGE_SIZE = 500
+
+    def __init__(self, **kwargs):
+        super(WordListView, self).__init__(**kwargs)
+        self.viewclass = WordListItem
+        layout = SelectableRecycleBoxLayout(
+            orientation='vertical',
+            default_size=(None, self.ROW_HEIGHT),
+            default_size_hint=(1, None),
+            size_hint_y=None,
+            spacing=self.ROW_SPACING,
+            padding=[self.PADDING] * 4,
+            multiselect=False,
+            touch_multiselect=False
+        )
+        layout.bind(minimum_height=layout.setter('height'))
+        self.add_widget(layout)
+        self.page_source = None  # page_source(起点, 数量, 是否包含起点) 按字母顺序返回一页单词
+        self.remove_callback = None
+        self.start_word = ''  # 列表从该单词开始显示
+        self.words = []  # 已读取的单词（有序）
+        self.exhausted = True
+        self.bind(scroll_y=self._load_more)
+    
+    def set_source(self, page_source, remove_callback, start=None):
+        """从 page_source 重新读取列表；start 为 None 时保持当前起点和已读取的行数"""
+        self.page_source = page_source
+        self.remove_callback = remove_callback
+        if start is not None:
+            self.start_word = start
+            count = self.PAGE_SIZE
+        else:
+            count = max(self.PAGE_SIZE, len(self.words))
+        self.words = page_source(self.start_word, count, True)
+        self.exhausted = len(self.words) < count
+        self.layout_manager.clear_selection()
+        self.data = [self._item(word) for word in self.words]
+        if start is not None:
+            self.scroll_y = 1
+    
+    def _item(self, word):
+        return {'word': word, 'remove_callback': self.remove_callback}
+    
+    def _load_more(self, instance, scroll_y):
+        """滚动接近底部时读取下一页"""
+        if scroll_y < 0.1 and not self.exhausted and self.words:
+            words = self.page_source(self.words[-1], self.PAGE_SIZE, False)
+            self.exhausted = len(words) < self.PAGE_SIZE
+            self.words.extend(words)
+            self.data.extend(self._item(word) for word in words)
+    
+    def show_word(self, word):
+        """选中并滚动到词库中的单词，不在已读取的范围内时从该单词开始重新读取列表"""
+        index = bisect_left(self.words, word)
+        if index >= len(self.words) or self.words[index] != word:
+            self.set_source(self.page_source, self.remove_callback, start=word)
+            index = 0
+        self.show_index(index)
+    
+    def show_index(self, index):
+        """选中第 index 行并滚动到该行"""
+        self.layout_manager.clear_selection()
+        self.layout_manager.select_node(index)
+        # 等布局按新数据更新高度后再计算滚动位置
+        Clock.schedule_once(lambda dt: self._scroll_to_index(index))
+    
+    def _scroll_to_index(self, index):
+        content_height = self.layout_manager.height
+        scrollable = content_height - self.height
+        if scrollable <= 0:
+            return
+        row_top = self.PADDING + index * (self.ROW_HEIGHT + self.ROW_SPACING)
+        # 让目标行位于可视区域中间
+        offset = row_top - (self.height - self.ROW_HEIGHT) / 2
+        self.scroll_y = 1 - min(max(offset / scrollable, 0), 1)
+
+
+class OutputParagraph(RecycleDataViewBehavior, Label):
+    """高亮结果中的一个段落 - RecycleView 复用的行视图，各自使用独立的小纹理"""
+    def __init__(self, **kwargs):
+        super(OutputParagraph, self).__init__(**kwargs)
+        self.index = None
+        self.output_view = None
+        self._item = None
+        self.markup = True
+        self.font_name = 'Chinese'
+        self.halign = 'left'
+        self.valign = 'top'
+        self.bind(width=self._update_text_size)
+        self.bind(texture_size=self._update_height)
+        self.bind(on_ref_press=self._on_ref_press)
+    
+    def refresh_view_attrs(self, rv, index, data):
+        """复用视图时更新段落数据，延迟加载的段落此时才生成 markup"""
+        self.index = index
+        self.output_view = rv
+        self._item = data
+        if data.get('lazy'):
+            data = dict(data, text=rv.markup_provider(index))
+        return super(OutputParagraph, self).refresh_view_attrs(rv, index, data)
+    
+    def _update_text_size(self, instance, width):
+        self.text_size = (width, None)
+    
+    def _update_height(self, instance, texture_size):
+        """按实际排版高度调整行高，并记入数据供布局复用"""
+        height = texture_size[1]
+        self.height = height
+        rv = self.output_view
+        if rv is not None and self.index is not None and self.index < len(rv.data):
+            item = rv.data[self.index]
+            if item is self._item:
+                item['measured_size'] = (None, height)
+    
+    def _on_ref_press(self, instance, ref):
+        if self.output_view is not None and self.output_view.ref_callback:
+            self.output_view.ref_callback(instance, ref)
+
+
+class HighlightOutputView(RecycleView):
+    """高亮结果视图 - 按段落分项显示，只为可见段落排版和生成纹理"""
+    # 段落尚未排版时的估计高度
+    ESTIMATED_HEIGHT = 60
+    # 延迟加载模式下每次追加的段落数（滚动接近底部时追加）
+    LAZY_PAGE = 500
+
+    def __init__(self, ref_callback=None, **kwargs):
+        super(HighlightOutputView, self).__init__(**kwargs)
+        self.ref_callback = ref_callback
+        # 延迟加载模式：markup_provider(index) 按需生成段落 markup
+        self.markup_provider = None
+        self.lazy_total = 0
+        self.bind(scroll_y=self._load_more)
+        self.viewclass = OutputParagraph
+        layout = RecycleBoxLayout(
+            orientation='vertical',
+            default_size=(None, self.ESTIMATED_HEIGHT),
+            default_size_hint=(1, None),
+            key_size='measured_size',
+            size_hint_y=None,
+            spacing=12,
+            padding=[5, 5, 5, 5]
+        )
+        layout.bind(minimum_height=layout.setter('height'))
+        self.add_widget(layout)
+    
+    def _item(self, markup):
+        return {'text': markup, 'measured_size': (None, self.ESTIMATED_HEIGHT)}
+    
+    def set_paragraphs(self, markups):
+        """替换全部段落"""
+        self.markup_provider = None
+        self.data = [self._item(markup) for markup in markups]
+        self.scroll_y = 1
+    
+    def set_lazy(self, total, markup_provider):
+        """延迟加载模式：共 total 个段落，滚动到时才调用 markup_provider 生成"""
+        self.markup_provider = markup_provider
+        self.lazy_total = total
+        self.data = []
+        self._append_lazy()
+        self.scroll_y = 1
+    
+    def _append_lazy(self):
+        count = min(self.LAZY_PAGE, self.lazy_total - len(self.data))
+        self.data.extend(
+            {'lazy': True, 'measured_size': (None, self.ESTIMATED_HEIGHT)} for _ in range(count)
+        )
+    
+    def _load_more(self, instance, scroll_y):
+        """滚动接近底部时追加下一批延迟段落，数据量只随阅读位置增长"""
+        if self.markup_provider is not None and scroll_y < 0.1 and len(self.data) < self.lazy_total:
+            self._append_lazy()
+    
+    def append_paragraphs(self, markups):
+        """在末尾追加段落"""
+        self.data.extend(self._item(markup) for markup in markups)
+    
+    def refresh_paragraph(self, index):
+        """延迟加载的段落内容已更新（如后台高亮完成），只刷新该行"""
+        if index < len(self.data):
+            self.data[index] = dict(self.data[index])
+    
+    def update_paragraph(self, index, markup):
+        """替换一个段落的内容，保留已测得的高度"""
+        item = dict(self.data[index])
+        item['text'] = markup
+        self.data[index] = item
+
+
 class WordHighlighterApp(App):
     """单词高亮工具主应用"""
+    # 内存映射模式下缓存的已高亮段落数
+    MAPPED_CACHE_SIZE = 256
+    # 超过该大小的 TXT 文件以流式方式导入，输入框只显示预览
+    STREAM_IMPORT_BYTES = 2 * 1024 * 1024
+    PREVIEW_CHARS = 20000
+    # spaCy 模型在后台加载完成后，是否用模型重新高亮已显示的文本
+    UPGRADE_ON_MODEL_READY = True
+    # 词库搜索每次查询的匹配项数
+    SEARCH_PAGE = 200
+    # 网页最多下载的字节数
+    MAX_PAGE_BYTES = 4 * 1024 * 1024
+    # Linux 桌面上不少于该字符数的文本改用多进程高亮
+    PARALLEL_MIN_CHARS = 1024 * 1024
     
     def __init__(self, **kwargs):
         super(WordHighlighterApp, self).__init__(**kwargs)
+        self._start_time = time.perf_counter()
         self.word_bank = None
+        self.document = None  # 当前输出对应的已高亮文档，词库变化时增量更新
+        self.text_source = None  # 流式导入的大文件，输入框中只是它的预览
+        self.text_source_preview = None
+        self.mapped_document = None  # 内存映射模式打开的大文件
+        self.mapped_markups = OrderedDict()  # 段落序号 -> (词库版本, markup)（LRU）
+        self.mapped_generation = 0  # 词库版本，词库变化后已缓存的段落需要重新高亮
+        self.mapped_pending = OrderedDict()  # 等待后台高亮的段落序号 -> 所属文档，最近请求的在最后
+        self.mapped_lock = threading.Lock()
+        self.mapped_draining = False  # 是否已有后台任务在处理 mapped_pending
+        self.mapped_requests = 0
+        self.jobs = JobScheduler()  # 高亮、网页获取和翻译的后台任务
+        self.parallel_highlighter = None  # 多进程高亮引擎，首次处理大文本时创建
+        self.web_fetcher = None
         self.progress_value = NumericProperty(0)
         self.file_chooser_callback = None  # 文件选择回调
         self._register_fonts()
@@ -353,8 +416,15 @@ class WordHighlighterApp(App):
         # 设置窗口背景色
         Window.clearcolor = (0.96, 0.96, 0.96, 1)
         
-        # 初始化词库
-        self.word_bank = WordBank(show_error_callback=self.show_popup)
+        # 初始化词库（词形缓存保存在应用数据目录，下次启动直接命中）
+        self.word_bank = WordBank(
+            show_error_callback=self.show_popup,
+            lemma_cache_path=os.path.join(self.user_data_dir, 'lemma_cache.tsv'),
+            on_model_ready=self._on_model_ready
+        )
+        # 网页获取共用一个连接池，响应缓存在应用数据目录
+        self.web_fetcher = WebFetcher(cache_dir=os.path.join(self.user_data_dir, 'http_cache'))
+        Clock.schedule_once(self._report_startup_time)
         
         # 主布局
         main_layout = BoxLayout(orientation='vertical', padding=10, spacing=10)
@@ -454,22 +524,12 @@ class WordHighlighterApp(App):
         # 输出文本区域
         layout.add_widget(Label(text='输出文本:', size_hint_y=None, height=30, font_name='Chinese'))
         
-        # 使用 Label 显示输出文本（支持markup和点击）
-        scroll = ScrollView()
-        
-        self.output_text = Label(
-            text='高亮结果将显示在此...\n\n提示：\n1. 橙色单词：已在词库中，可点击定位或删除\n2. 普通单词：点击可直接添加到词库',
-            markup=True,
-            font_name='Chinese',
-            size_hint_y=None,
-            text_size=(Window.width - 40, None),
-            halign='left',
-            valign='top'
-        )
-        self.output_text.bind(texture_size=self.output_text.setter('size'))
-        self.output_text.bind(on_ref_press=self.on_word_click)  # 绑定高亮单词点击
-        scroll.add_widget(self.output_text)
-        layout.add_widget(scroll)
+        # 按段落分项显示输出文本（支持markup和点击），长文档也只排版可见段落
+        self.output_view = HighlightOutputView(ref_callback=self.on_word_click)  # 绑定高亮单词点击
+        self.output_view.set_paragraphs([
+            '高亮结果将显示在此...\n\n提示：\n1. 橙色单词：已在词库中，可点击定位或删除\n2. 普通单词：点击可直接添加到词库'
+        ])
+        layout.add_widget(self.output_view)
         
         return layout
     
@@ -479,9 +539,9 @@ class WordHighlighterApp(App):
         
         # 提示信息
         warning = Label(
-            text='词库存储在内存中，关闭程序后将丢失。请及时保存到文件。',
+            text='词库保存或加载文件后，修改会自动记录到该文件的日志；\n尚未保存过的词库关闭程序后将丢失。',
             size_hint_y=None,
-            height=40,
+            height=50,
             font_name='Chinese',
             color=(1, 0, 0, 1)
         )
@@ -566,28 +626,34 @@ class WordHighlighterApp(App):
         )
         layout.add_widget(list_label)
         
-        # 创建滚动视图来显示词库列表
-        scroll_view = ScrollView(size_hint=(1, 1), do_scroll_x=False, bar_width=10)
+        # 词库为空时的提示
+        self.word_list_empty_label = Label(
+            text='',
+            font_name='Chinese',
+            color=(0.5, 0.5, 0.5, 1),
+            font_size='16sp',
+            size_hint_y=None,
+            height=0
+        )
+        layout.add_widget(self.word_list_empty_label)
+        
+        # 使用 RecycleView 显示词库列表，只有可见行会创建控件
+        self.word_list_view = WordListView(size_hint=(1, 1), do_scroll_x=False, bar_width=10)
+        self.search_matches = []  # 当前一页的匹配单词
+        self.search_offset = 0  # 当前页在全部匹配项中的起始位置
+        self.search_position = 0
+        self.search_keyword = ''
         
-        # 添加白色背景到 ScrollView
+        # 添加白色背景
         from kivy.graphics import Color, Rectangle
-        with scroll_view.canvas.before:
+        list_view = self.word_list_view
+        with list_view.canvas.before:
             Color(1, 1, 1, 1)
-            scroll_view.bg_rect = Rectangle(pos=scroll_view.pos, size=scroll_view.size)
-        scroll_view.bind(pos=lambda i, v: setattr(scroll_view.bg_rect, 'pos', v))
-        scroll_view.bind(size=lambda i, v: setattr(scroll_view.bg_rect, 'size', v))
-        
-        # 创建列表容器
-        self.word_list_container = GridLayout(
-            cols=1,
-            spacing=3,
-            size_hint_y=None,
-            padding=[5, 5, 5, 5]
-        )
-        self.word_list_container.bind(minimum_height=self.word_list_container.setter('height'))
+            list_view.bg_rect = Rectangle(pos=list_view.pos, size=list_view.size)
+        list_view.bind(pos=lambda i, v: setattr(list_view.bg_rect, 'pos', v))
+        list_view.bind(size=lambda i, v: setattr(list_view.bg_rect, 'size', v))
         
-        scroll_view.add_widget(self.word_list_container)
-        layout.add_widget(scroll_view)
+        layout.add_widget(list_view)
         
         # 更新按钮
         update_btn = Button(
@@ -629,6 +695,26 @@ class WordHighlighterApp(App):
         load_btn.bind(on_press=self.load_word_bank)
         layout.add_widget(load_btn)
         
+        # 附加词库（如 CET-4、CET-6）与主词库同时生效，按词库颜色区分
+        named_box = BoxLayout(size_hint_y=None, height=50, spacing=5)
+        named_load_btn = Button(
+            text='加载附加词库',
+            size_hint_x=0.6,
+            font_name='Chinese',
+            background_color=(0.13, 0.59, 0.95, 1)
+        )
+        named_load_btn.bind(on_press=self.load_named_bank)
+        named_box.add_widget(named_load_btn)
+        named_clear_btn = Button(
+            text='卸载附加词库',
+            size_hint_x=0.4,
+            font_name='Chinese',
+            background_color=(0.8, 0.2, 0.2, 1)
+        )
+        named_clear_btn.bind(on_press=self.clear_named_banks)
+        named_box.add_widget(named_clear_btn)
+        layout.add_widget(named_box)
+        
         # 文本文件操作
         layout.add_widget(Label(text='文本文件操作', size_hint_y=None, height=40, font_name='Chinese', bold=True))
         
@@ -642,18 +728,28 @@ class WordHighlighterApp(App):
         import_txt_btn.bind(on_press=self.import_txt_file)
         layout.add_widget(import_txt_btn)
         
+        mapped_btn = Button(
+            text='大文件模式打开（滚动时高亮）',
+            size_hint_y=None,
+            height=50,
+            font_name='Chinese',
+            background_color=(0.13, 0.59, 0.95, 1)
+        )
+        mapped_btn.bind(on_press=self.open_mapped_file)
+        layout.add_widget(mapped_btn)
+        
         # 文件路径输入（所有平台）
         if platform == 'android':
             hint_text = '/sdcard/wordbank.txt'
-            info_text = 'Android 文件路径提示:\n• 默认路径：/sdcard/ 或 /storage/emulated/0/\n• 下载文件夹：/sdcard/Download/\n• 需要存储权限'
+            info_text = 'Android 文件路径提示:\n• 默认路径：/sdcard/ 或 /storage/emulated/0/\n• 下载文件夹：/sdcard/Download/\n• 需要存储权限\n• 词库扩展名为 .whb 时保存为二进制格式'
         else:
             hint_text = 'wordbank.txt'
-            info_text = '文件路径提示:\n输入完整路径或相对路径（相对于当前目录）'
+            info_text = '文件路径提示:\n输入完整路径或相对路径（相对于当前目录）\n词库扩展名为 .whb 时保存为二进制格式'
         
         layout.add_widget(Label(
             text=info_text,
             size_hint_y=None,
-            height=80 if platform == 'android' else 60,
+            height=100 if platform == 'android' else 80,
             font_name='Chinese'
         ))
         
@@ -743,7 +839,8 @@ class WordHighlighterApp(App):
             btn_box.add_widget(cancel_btn)
             content.add_widget(btn_box)
         else:
-            # 桌面平台使用文件选择器
+            # 桌面平台使用文件选择器（首次打开时才导入）
+            from kivy.uix.filechooser import FileChooserListView
             filechooser = FileChooserListView(
                 path=os.path.expanduser('~'),
                 filters=filters if filters else ['*.*']
@@ -804,18 +901,20 @@ class WordHighlighterApp(App):
             self.show_popup('错误', '请输入有效的URL！')
             return
         
-        def fetch():
+        def fetch(job):
             try:
-                response = requests.get(url, timeout=10)
-                response.raise_for_status()
-                soup = BeautifulSoup(response.text, 'html.parser')
-                text = soup.get_text()
+                # 下载量有上限，边下载边提取正文，丢弃脚本、样式和导航等非正文内容
+                text, from_cache = self.web_fetcher.fetch_text(url, max_bytes=self.MAX_PAGE_BYTES)
+                if job.cancelled:
+                    # 期间已请求了其他网址，丢弃这次的结果
+                    return
                 Clock.schedule_once(lambda dt: self._set_input_text(text))
-                self.show_popup('成功', '网页内容已成功导入！')
+                self.show_popup('成功', '网页内容已成功导入！（来自缓存）' if from_cache else '网页内容已成功导入！')
             except Exception as e:
-                self.show_popup('错误', f'获取网页内容失败：{e}')
+                if not job.cancelled:
+                    self.show_popup('错误', f'获取网页内容失败：{e}')
         
-        threading.Thread(target=fetch, daemon=True).start()
+        self.jobs.submit('fetch', url, fetch)
     
     @mainthread
     def _set_input_text(self, text):
@@ -829,64 +928,294 @@ class WordHighlighterApp(App):
             self.show_popup('错误', '请输入文本以进行高亮！')
             return
         
-        def process():
-            text_cleaned = re.sub(r'\n\s*\n', '\n\n', text)
-            paragraphs = text_cleaned.split('\n\n')
-            total = len(paragraphs)
-            
-            result_markup = ''
-            word_count = 0  # 用于唯一标识每个单词
-            
-            for i, paragraph in enumerate(paragraphs):
-                if paragraph.strip():
-                    highlighted = self.word_bank.highlight_words(paragraph)
-                    for segment, tag, lemma in highlighted:
-                        if tag == "highlight":
-                            # 使用 Kivy ref 标签实现可点击的高亮（已在词库）
-                            result_markup += f'[b][color=ff6b00][ref={lemma}_{word_count}_IN]{segment}[/ref][/color][/b]'
-                            word_count += 1
-                        else:
-                            # 检查是否为单词，如果是则添加可点击功能（未在词库）
-                            if segment.strip() and segment.strip().isalpha():
-                                word = segment.strip()
-                                lemma_normalized = self.word_bank.normalize_word(word)
-                                result_markup += f'[ref={lemma_normalized}_{word_count}_OUT]{segment}[/ref]'
-                                word_count += 1
-                            else:
-                                result_markup += segment
-                    
-                    if i < len(paragraphs) - 1:
-                        result_markup += '\n\n'
-                
-                # 更新进度
-                progress = (i + 1) / total * 100
-                Clock.schedule_once(lambda dt, p=progress: self._update_progress(p))
+        source = self.text_source
+        if source is not None and self.input_text.text == self.text_source_preview:
+            # 输入框中是大文件的预览：改用内存映射的延迟视图，只高亮并保留滚动到的段落，
+            # 内存占用不随文件大小增长
+            try:
+                document = MappedTextDocument(source.filepath, source.encoding)
+            except Exception as e:
+                self.show_popup('错误', f'打开文件时出错：{e}')
+                return
+            self._show_mapped_document(document)
+            print(f"[调试] 大文件改为延迟高亮: {source.filepath}，共 {len(document)} 段")
+            return
+        
+        # 普通文本或已被编辑的预览：处理输入框中的文本
+        self.text_source = None
+        text_cleaned = re.sub(r'\n\s*\n', '\n\n', text)
+        # 每个段落是输出视图中的一项（一个纹理），只用单个换行的长文本按行拆成多项
+        paragraphs = [piece for p in text_cleaned.split('\n\n') if p.strip() for piece in split_long_paragraph(p)]
+        total = len(paragraphs)
+        progress_of = lambda done: done / total * 100
+        size = len(text)
+        
+        # 相同文本和词形还原方式的重复点击合并为一次，新文本会取消尚未完成的旧任务
+        key = (text, self.word_bank.nlp is not None)
+        self.jobs.submit('highlight', key, self._highlight_paragraphs, paragraphs, progress_of,
+                         self._highlighter_for(size))
+    
+    def _highlighter_for(self, size):
+        """spaCy 模式下的大文本在 Linux 桌面上使用多进程引擎，其余情况在后台线程中直接高亮"""
+        # 简化模式的词形还原很快，分发和合并的开销反而更大
+        if size < self.PARALLEL_MIN_CHARS or self.word_bank.nlp is None or not ParallelHighlighter.available(require_fork=True):
+            return self.word_bank
+        if self.parallel_highlighter is None:
+            self.parallel_highlighter = ParallelHighlighter(self.word_bank)
+        return self.parallel_highlighter
+    
+    def _highlight_paragraphs(self, job, paragraphs, progress_of, highlighter):
+        """在后台线程高亮段落序列并流式输出，progress_of(已处理段落数) 返回进度百分比"""
+        # 每个段落单独渲染，按批次追加到输出视图，不必等整篇文档处理完
+        self._set_document(None, job)
+        self._set_output_text('', job)
+        self._leave_mapped_mode()
+        document = HighlightDocument()
+        rendered = []
+        bank_colors = self.word_bank.bank_colors
+        document.bank_colors = bank_colors
+        renderer = MarkupRenderer(on_chunk=rendered.append, paragraph_separator='', bank_colors=bank_colors)
+        
+        # 所有段落一次性送入批处理管线，按批次更新进度；进度和输出都经限速后再推送到界面
+        batch_size = self.word_bank.PIPE_BATCH_SIZE
+        nonblank = (p for p in paragraphs if p.strip())
+        reporter = ProgressReporter(lambda value, rate, eta: self._update_progress(value, rate, eta, job))
+        count = 0
+        for highlighted in highlighter.highlight_paragraphs(nonblank):
+            if job.cancelled:
+                # 已有更新的高亮任务，在段落之间退出
+                print("[调试] 高亮任务已取消")
+                return
+            document.add_paragraph(highlighted, renderer.word_count)
+            renderer.add_paragraph(highlighted)
+            count += 1
             
-            Clock.schedule_once(lambda dt: self._set_output_text(result_markup))
-            Clock.schedule_once(lambda dt: self._update_progress(100))
-            time.sleep(0.5)
-            Clock.schedule_once(lambda dt: self._update_progress(0))
+            # 每完成一批检查一次，进度通知时顺带推送积累的结果
+            if count % batch_size == 0 and reporter.update(progress_of(count), count):
+                self._append_output_paragraphs(rendered[:], job)
+                rendered.clear()
+        
+        self._append_output_paragraphs(rendered[:], job)
+        print(f"[调试] 词形缓存: {self.word_bank.lemma_cache.stats()}")
+        self._set_document(document, job)
+        reporter.finish(count)
+        elapsed = time.perf_counter() - reporter.start_time
+        print(f"[调试] 高亮完成: {count} 段，耗时 {elapsed:.2f} 秒，进度更新 {reporter.updates} 次")
+    
+    def _report_startup_time(self, dt):
+        """记录冷启动到首帧的耗时"""
+        elapsed = time.perf_counter() - self._start_time
+        print(f"[调试] 首帧耗时: {elapsed:.2f} 秒（模型状态: {self.word_bank.model_state}）")
+    
+    @mainthread
+    def _on_model_ready(self):
+        """模型就绪后，用模型重新高亮已显示的文本"""
+        if self.UPGRADE_ON_MODEL_READY and self.document is not None:
+            print("[调试] spaCy 模型已就绪，重新高亮当前文本")
+            self.highlight_text(None)
+        elif self.UPGRADE_ON_MODEL_READY and self.mapped_document is not None:
+            self._refresh_mapped_view()
+    
+    @mainthread
+    def _set_document(self, document, job=None):
+        """记录当前输出对应的已高亮文档，job 已取消时忽略"""
+        if job is not None and job.cancelled:
+            return
+        self.document = document
+        # 高亮期间词库可能已变化，按最新词库校正一次
+        if document is not None:
+            self._apply_bank_to_document()
+    
+    def _apply_bank_to_document(self):
+        """按当前主词库和附加词库刷新已高亮的输出"""
+        if self.document is not None:
+            word_bank = self.word_bank
+            self._rerender_paragraphs(self.document.apply_bank(
+                word_bank.words, word_bank.bank_masks, word_bank.bank_colors))
+        elif self.mapped_document is not None:
+            self._refresh_mapped_view()
+    
+    def _on_bank_changed(self, lemma, in_bank):
+        """词库增删单词后，只重新渲染包含该词形的段落"""
+        if self.document is not None and lemma:
+            self._rerender_paragraphs(self.document.set_lemma_state(lemma, in_bank))
+        elif self.mapped_document is not None:
+            self._refresh_mapped_view()
+    
+    def _rerender_paragraphs(self, indices):
+        for index in indices:
+            self.output_view.update_paragraph(index, self.document.paragraph_markup(index))
+    
+    def open_mapped_file(self, instance):
+        """以内存映射方式打开大文件：只扫描段落偏移，段落滚动到时才解码和高亮"""
+        filepath = self.file_path_input.text.strip()
+        if not filepath:
+            self.show_popup('错误', '请输入文件路径！')
+            return
         
-        threading.Thread(target=process, daemon=True).start()
+        if not os.path.exists(filepath):
+            self.show_popup('提示', f'文件不存在：{filepath}\n请检查文件路径。')
+            return
+        
+        try:
+            start = time.perf_counter()
+            document = MappedTextDocument(filepath)
+            elapsed = time.perf_counter() - start
+        except Exception as e:
+            self.show_popup('错误', f'打开文件时出错：{e}')
+            return
+        
+        self._show_mapped_document(document)
+        print(f"[调试] 段落扫描耗时: {elapsed:.2f} 秒，共 {len(document)} 段")
+        self.show_popup('成功', f'已以大文件模式打开：{filepath}\n编码：{document.encoding}\n共 {len(document)} 段\n\n'
+                              f'请切换到"文本处理"选项卡，滚动时逐段高亮')
+    
+    def _show_mapped_document(self, document):
+        """切换到内存映射模式：输出视图按需高亮滚动到的段落"""
+        # 正在进行的高亮任务不再写入输出
+        self.jobs.cancel('highlight')
+        self._close_mapped_document()
+        self._set_document(None)
+        self.mapped_document = document
+        self.output_view.set_lazy(len(document), self._mapped_paragraph_markup)
+    
+    def _mapped_paragraph_markup(self, index):
+        """返回内存映射文件中一个段落的 markup（在界面线程调用，不做高亮）
+
+        尚未高亮时先返回未高亮的原文作为占位，词库变化后先显示旧结果，同时交给后台线程高亮，完成后再填入该行。
+        """
+        cached = self.mapped_markups.get(index)
+        if cached is not None:
+            self.mapped_markups.move_to_end(index)
+            generation, markup = cached
+            if generation == self.mapped_generation:
+                return markup
+        else:
+            markup = MarkupRenderer.plain_markup(self.mapped_document.paragraph(index))
+        self._request_mapped_paragraph(index)
+        return markup
+    
+    def _request_mapped_paragraph(self, index):
+        """把段落加入后台高亮队列，同一时间只有一个后台任务按最近请求优先处理队列"""
+        with self.mapped_lock:
+            self.mapped_pending[index] = self.mapped_document
+            self.mapped_pending.move_to_end(index)
+            # 快速滚动时只保留最近请求的段落，滚出视野的段落再次显示时会重新请求
+            if len(self.mapped_pending) > self.MAPPED_CACHE_SIZE:
+                self.mapped_pending.popitem(last=False)
+            if self.mapped_draining:
+                return
+            self.mapped_draining = True
+            self.mapped_requests += 1
+            key = self.mapped_requests
+        self.jobs.submit('mapped', key, self._highlight_mapped_paragraphs)
+    
+    def _highlight_mapped_paragraphs(self, job):
+        """后台线程：逐个高亮排队的段落，结果交给主线程缓存并刷新对应行"""
+        while not job.cancelled:
+            with self.mapped_lock:
+                if not self.mapped_pending:
+                    self.mapped_draining = False
+                    return
+                index, document = self.mapped_pending.popitem(last=True)
+            if document is not self.mapped_document:
+                continue
+            generation = self.mapped_generation
+            try:
+                segments = self.word_bank.highlight_words(document.paragraph(index))
+                markup, _ = MarkupRenderer.paragraph_markup(segments, 0, self.word_bank.bank_colors)
+            except Exception as e:
+                # 文档可能已在界面线程中关闭
+                if document is self.mapped_document:
+                    print(f"高亮段落 {index} 出错: {e}")
+                continue
+            self._set_mapped_markup(document, index, generation, markup)
+        with self.mapped_lock:
+            self.mapped_draining = False
     
     @mainthread
-    def _update_progress(self, value):
-        """更新进度条"""
+    def _set_mapped_markup(self, document, index, generation, markup):
+        """缓存后台高亮好的段落并刷新该行，文档已切换时丢弃"""
+        if document is not self.mapped_document:
+            return
+        self.mapped_markups[index] = (generation, markup)
+        self.mapped_markups.move_to_end(index)
+        if len(self.mapped_markups) > self.MAPPED_CACHE_SIZE:
+            self.mapped_markups.popitem(last=False)
+        self.output_view.refresh_paragraph(index)
+    
+    def _refresh_mapped_view(self):
+        """词库变化后已缓存的段落作废（重新高亮完成前仍显示旧结果），可见段落重新排队高亮"""
+        self.mapped_generation += 1
+        self.output_view.refresh_from_data()
+    
+    @mainthread
+    def _leave_mapped_mode(self):
+        """普通高亮开始时退出内存映射模式"""
+        self._close_mapped_document()
+    
+    def _close_mapped_document(self):
+        if self.mapped_document is not None:
+            with self.mapped_lock:
+                self.mapped_pending.clear()
+            self.mapped_document.close()
+            self.mapped_document = None
+            self.mapped_markups.clear()
+    
+    def on_pause(self):
+        """切到后台时把词库日志刷到磁盘（Android 可能随时结束后台进程）"""
+        if self.word_bank and self.word_bank.journal:
+            self.word_bank.journal.sync()
+        return True
+    
+    def on_stop(self):
+        """退出时取消后台任务、保存词形缓存并关闭词库日志"""
+        self.jobs.shutdown()
+        if self.parallel_highlighter is not None:
+            self.parallel_highlighter.close()
+        if self.web_fetcher is not None:
+            self.web_fetcher.close()
+        if self.word_bank:
+            self.word_bank.save_lemma_cache()
+            self.word_bank.close_journal()
+            self.word_bank.words.close()
+    
+    @mainthread
+    def _update_progress(self, value, rate=None, eta=None, job=None):
+        """更新进度条，rate/eta 为每秒段落数和预计剩余秒数；完成后稍作停留再清空"""
+        if job is not None and job.cancelled:
+            return
         self.progress_bar.value = value
-        if value > 0:
-            self.progress_label.text = f'{int(value)}%'
+        if value >= 100:
+            self.progress_label.text = '100%' if rate is None else f'100%  ({rate:.0f} 段/秒)'
+            Clock.schedule_once(lambda dt: self._update_progress(0), 0.5)
+        elif value > 0:
+            text = f'{int(value)}%'
+            if rate is not None:
+                text += f'  {rate:.0f} 段/秒，剩余约 {eta:.0f} 秒'
+            self.progress_label.text = text
         else:
             self.progress_label.text = ''
     
     @mainthread
-    def _set_output_text(self, text):
-        """设置输出文本"""
-        self.output_text.text = text
+    def _set_output_text(self, text, job=None):
+        """设置输出文本，job 已取消时忽略"""
+        if job is not None and job.cancelled:
+            return
+        self.output_view.set_paragraphs([text] if text else [])
+    
+    @mainthread
+    def _append_output_paragraphs(self, markups, job=None):
+        """追加一批段落到输出视图，job 已取消时丢弃（避免旧任务的结果混入新输出）"""
+        if job is not None and job.cancelled:
+            return
+        self.output_view.append_paragraphs(markups)
     
     def remove_word_from_list(self, word):
         """从列表中删除单词"""
         if word in self.word_bank.words:
             self.word_bank.remove_word(word)
+            self._on_bank_changed(word, False)
             self.update_word_list(None)
             self.show_popup('成功', f"单词 '{word}' 已从词库删除！")
     
@@ -918,6 +1247,7 @@ class WordHighlighterApp(App):
             word = word_input.text.strip().lower()
             if word and word.isalpha():
                 self.word_bank.add_word(word)
+                self._on_bank_changed(word, True)
                 self.update_word_list(None)
                 self.show_popup('成功', f"单词 '{word}' 已添加到词库！")
                 add_popup.dismiss()
@@ -966,6 +1296,15 @@ class WordHighlighterApp(App):
             bold=True
         ))
         
+        bank_names = self.word_bank.bank_names(lemma)
+        if bank_names:
+            content.add_widget(Label(
+                text=f'附加词库: {"、".join(bank_names)}',
+                size_hint_y=None,
+                height=30,
+                font_name='Chinese'
+            ))
+        
         # 根据单词是否在词库显示不同的操作
         if in_wordbank:
             # 已在词库中的单词
@@ -1029,33 +1368,20 @@ class WordHighlighterApp(App):
     
     def locate_word_in_list(self, lemma):
         """在词库列表中定位单词"""
-        from kivy.graphics import Color, Rectangle
-        
-        words = sorted(self.word_bank.words)
-        if lemma in words:
-            index = words.index(lemma)
-            # 重新显示完整列表，并高亮目标单词
-            self.word_list_container.clear_widgets()
-            for i, word in enumerate(words):
-                item = WordListItem(word, self.remove_word_from_list)
-                # 如果是目标单词，改变背景色高亮显示
-                if word == lemma:
-                    with item.canvas.before:
-                        Color(1, 1, 0.7, 1)  # 黄色高亮
-                        item.highlight_rect = Rectangle(pos=item.pos, size=item.size)
-                    item.bind(pos=lambda i, v, r=item.highlight_rect: setattr(r, 'pos', v))
-                    item.bind(size=lambda i, v, r=item.highlight_rect: setattr(r, 'size', v))
-                self.word_list_container.add_widget(item)
+        if lemma in self.word_bank.words:
+            # 选中并滚动到目标单词，不在已读取的页中时从该单词开始读取列表
+            self.word_list_view.show_word(lemma)
             
-            self.show_popup('定位', f'单词 "{lemma}" 在词库列表第 {index + 1} 位\n已用黄色高亮显示\n\n请切换到"词库管理"选项卡查看')
+            self.show_popup('定位', f'单词 "{lemma}" 已在词库列表中定位\n已用黄色高亮显示\n\n请切换到"词库管理"选项卡查看')
         else:
             self.show_popup('提示', f'单词 "{lemma}" 不在词库中')
     
     def remove_word_from_click(self, lemma):
         """从点击的单词删除"""
         if self.word_bank.remove_word(lemma):
+            self._on_bank_changed(lemma, False)
             self.update_word_list(None)
-            self.show_popup('成功', f"单词 '{lemma}' 已从词库移除！\n请重新高亮文本以更新显示。")
+            self.show_popup('成功', f"单词 '{lemma}' 已从词库移除！")
         else:
             self.show_popup('错误', f"单词 '{lemma}' 不在词库中！")
     
@@ -1065,12 +1391,13 @@ class WordHighlighterApp(App):
             self.show_popup('提示', f"单词 '{lemma}' 已在词库中！")
         else:
             self.word_bank.add_word(lemma)
+            self._on_bank_changed(lemma, True)
             self.update_word_list(None)
-            self.show_popup('成功', f"单词 '{lemma}' 已添加到词库！\n请重新高亮文本以更新显示。")
+            self.show_popup('成功', f"单词 '{lemma}' 已添加到词库！")
     
     def translate_text(self, instance):
         """翻译文本（Android版本 - 使用对话框输入）"""
-        if not _TRANSLATOR_AVAILABLE:
+        if not translator_available():
             self.show_popup('错误', '翻译功能不可用：未安装 googletrans 库')
             return
         
@@ -1122,19 +1449,27 @@ class WordHighlighterApp(App):
             if text:
                 try:
                     result_label.text = '翻译中...'
-                    # 在新线程中执行翻译
-                    def translate_thread():
+                    # 在后台任务中执行翻译，重复点击同一文本只翻译一次
+                    def translate_thread(job):
                         try:
+                            translator = get_translator()
+                            if translator is None:
+                                raise RuntimeError('未能初始化 googletrans')
                             translation = translator.translate(text, dest='zh-CN')
+                            if job.cancelled:
+                                return
                             Clock.schedule_once(
                                 lambda dt: setattr(result_label, 'text', 
                                     f'原文：{text}\n\n译文：{translation.text}')
                             )
                         except Exception as e:
-                            Clock.schedule_once(
-                                lambda dt: setattr(result_label, 'text', f'翻译失败：{e}')
-                            )
-                    threading.Thread(target=translate_thread, daemon=True).start()
+                            if not job.cancelled:
+                                # except 块结束后 e 会被删除，先取出错误信息再交给回调
+                                message = f'翻译失败：{e}'
+                                Clock.schedule_once(
+                                    lambda dt: setattr(result_label, 'text', message)
+                                )
+                    self.jobs.submit('translate', text, translate_thread)
                 except Exception as e:
                     result_label.text = f'翻译出错：{e}'
             else:
@@ -1172,7 +1507,7 @@ class WordHighlighterApp(App):
         word = self.word_input.text.strip()
         if word:
             word_lower = word.lower()
-            self.word_bank.add_word(word_lower)
+            self._on_bank_changed(self.word_bank.add_word(word_lower), True)
             self.update_word_list(None)  # 自动更新列表
             self.show_popup('成功', f"单词 '{word_lower}' 已添加到词库！")
             self.word_input.text = ''
@@ -1184,6 +1519,7 @@ class WordHighlighterApp(App):
         word = self.word_input.text.strip().lower()
         if word:
             if self.word_bank.remove_word(word):
+                self._on_bank_changed(word, False)
                 self.update_word_list(None)
                 self.show_popup('成功', f"单词 '{word}' 已从词库移除！")
                 self.word_input.text = ''
@@ -1195,64 +1531,73 @@ class WordHighlighterApp(App):
     def remove_word_from_list(self, word):
         """从列表中移除单词"""
         if self.word_bank.remove_word(word):
+            self._on_bank_changed(word, False)
             self.update_word_list(None)
             self.show_popup('成功', f"单词 '{word}' 已移除！")
     
     def search_word(self, instance):
-        """搜索单词"""
+        """搜索单词，选中并滚动到第一个匹配项（匹配项按页查询）"""
         keyword = self.search_input.text.strip().lower()
         if keyword:
-            matching_words = [w for w in sorted(self.word_bank.words) if keyword in w]
-            if matching_words:
-                # 清空并显示匹配的单词
-                self.word_list_container.clear_widgets()
-                for word in matching_words:
-                    item = WordListItem(word, self.remove_word_from_list)
-                    self.word_list_container.add_widget(item)
-                self.show_popup('搜索结果', f'找到 {len(matching_words)} 个匹配项')
+            self.search_keyword = keyword
+            self.search_offset = 0
+            self.search_matches = self.word_bank.search_words(keyword, 0, self.SEARCH_PAGE)
+            self.search_position = 0
+            if self.search_matches:
+                self.word_list_view.show_word(self.search_matches[0])
+                count = len(self.search_matches)
+                found = f'至少 {count}' if count >= self.SEARCH_PAGE else f'{count}'
+                self.show_popup('搜索结果', f'找到 {found} 个匹配项\n点击"下一个"跳到下一项')
             else:
                 self.show_popup('提示', '未找到匹配项')
         else:
-            self.update_word_list(None)
+            self.update_word_list(None, start='')
     
     def search_next(self, instance):
-        """搜索下一个（简化版）"""
-        self.search_word(instance)
+        """跳到下一个匹配项，当前页用完时查询下一页，最后一页之后回到第一项"""
+        keyword = self.search_input.text.strip().lower()
+        if not keyword or keyword != self.search_keyword or not self.search_matches:
+            self.search_word(instance)
+            return
+        self.search_position += 1
+        if self.search_position >= len(self.search_matches):
+            self.search_offset += len(self.search_matches)
+            matches = self.word_bank.search_words(keyword, self.search_offset, self.SEARCH_PAGE)
+            if not matches:
+                self.search_offset = 0
+                matches = self.word_bank.search_words(keyword, 0, self.SEARCH_PAGE)
+            self.search_matches = matches
+            self.search_position = 0
+            if not matches:
+                return
+        self.word_list_view.show_word(self.search_matches[self.search_position])
     
-    def update_word_list(self, instance):
-        """更新词库列表（使用GridLayout显示）"""
-        words = sorted(self.word_bank.words)
+    def update_word_list(self, instance, start=None):
+        """更新词库列表（RecycleView 按页读取）；start 为列表起点，None 时保持当前位置，手动刷新时回到开头"""
+        if instance:
+            start = ''
+        count = len(self.word_bank.words)
         
-        # 清空现有列表
-        self.word_list_container.clear_widgets()
+        # 只替换数据，行控件由 RecycleView 按需复用
+        self.word_list_view.set_source(self.word_bank.page, self.remove_word_from_list, start)
+        self.search_matches = []
         
         # 调试输出
-        print(f"[调试] 更新词库列表：共 {len(words)} 个单词")
-        if len(words) > 0:
-            print(f"[调试] 前5个单词: {words[:5]}")
+        print(f"[调试] 更新词库列表：共 {count} 个单词")
+        if count > 0:
+            print(f"[调试] 前5个单词: {self.word_list_view.words[:5]}")
         
         # 如果词库为空，显示提示
-        if len(words) == 0:
-            empty_label = Label(
-                text='词库为空\n\n请在上方输入框添加单词\n或在"文本处理"选项卡点击单词添加',
-                font_name='Chinese',
-                color=(0.5, 0.5, 0.5, 1),
-                font_size='16sp',
-                size_hint_y=None,
-                height=100
-            )
-            self.word_list_container.add_widget(empty_label)
+        if count == 0:
+            self.word_list_empty_label.text = '词库为空\n\n请在上方输入框添加单词\n或在"文本处理"选项卡点击单词添加'
+            self.word_list_empty_label.height = 100
         else:
-            # 添加每个单词到列表
-            for word in words:
-                item = WordListItem(word, self.remove_word_from_list)
-                self.word_list_container.add_widget(item)
-        
-        print(f"[调试] word_list_container 子控件数量: {len(self.word_list_container.children)}")
+            self.word_list_empty_label.text = ''
+            self.word_list_empty_label.height = 0
         
         if instance:  # 只在手动刷新时显示提示
-            if len(words) > 0:
-                self.show_popup('提示', f'词库共有 {len(words)} 个单词\n列表已更新！')
+            if count > 0:
+                self.show_popup('提示', f'词库共有 {count} 个单词\n列表已更新！')
             else:
                 self.show_popup('提示', '词库为空，请添加单词。')
     
@@ -1289,12 +1634,37 @@ class WordHighlighterApp(App):
             return
         
         if self.word_bank.load_word_bank(filepath):
-            # 重要：加载后立即更新词库列表显示
-            self.update_word_list(None)  # 不显示提示，让下面的成功消息显示
+            # 重要：加载后立即更新词库列表显示，并按新词库刷新已高亮的输出
+            self._apply_bank_to_document()
+            self.update_word_list(None, start='')  # 不显示提示，让下面的成功消息显示
             self.show_popup('成功', f'词库已从 {filepath} 加载！\n共 {len(self.word_bank.words)} 个单词\n\n请切换到"词库管理"选项卡查看列表。')
         else:
             self.show_popup('错误', f'加载词库时出错！文件路径：{filepath}')
     
+    def load_named_bank(self, instance):
+        """加载附加词库（以文件名作为词库名），与主词库同时以不同颜色高亮"""
+        filepath = self.file_path_input.text.strip()
+        if not filepath or not os.path.exists(filepath):
+            self.show_popup('提示', f'文件不存在：{filepath}\n请检查文件路径。')
+            return
+        
+        name = os.path.splitext(os.path.basename(filepath))[0]
+        if self.word_bank.load_named_bank(name, filepath):
+            self._apply_bank_to_document()
+            names = '、'.join(self.word_bank.named_banks)
+            self.show_popup('成功', f'附加词库 {name} 已加载！\n共 {len(self.word_bank.named_banks[name])} 个单词\n\n当前附加词库：{names}')
+        else:
+            self.show_popup('错误', f'加载附加词库时出错！文件路径：{filepath}')
+    
+    def clear_named_banks(self, instance):
+        """卸载所有附加词库"""
+        if not self.word_bank.named_banks:
+            self.show_popup('提示', '当前没有附加词库。')
+            return
+        self.word_bank.unload_named_bank()
+        self._apply_bank_to_document()
+        self.show_popup('成功', '已卸载所有附加词库。')
+    
     def import_txt_file(self, instance):
         """导入 TXT 文件"""
         filepath = self.file_path_input.text.strip()
@@ -1308,12 +1678,26 @@ class WordHighlighterApp(App):
             return
         
         try:
-            # 尝试多种编码
-            encodings = ['utf-8', 'gbk', 'gb2312', 'latin-1']
+            if os.path.getsize(filepath) > self.STREAM_IMPORT_BYTES:
+                # 大文件：只用文件开头的样本检测一次编码，输入框只显示预览，高亮时按段落延迟处理
+                used_encoding = detect_encoding(filepath)
+                if used_encoding is None:
+                    self.show_popup('错误', '无法读取文件，编码格式不支持。')
+                    return
+                source = TextFileSource(filepath, used_encoding)
+                self.text_source = source
+                self.input_text.text = source.preview(self.PREVIEW_CHARS)
+                # 记录输入框实际显示的文本（TextInput 会把 CRLF 规范为 LF），据此判断预览是否被编辑
+                self.text_source_preview = self.input_text.text
+                self.show_popup('成功', f'TXT 文件较大，已以流式方式导入！\n路径：{filepath}\n编码：{used_encoding}\n\n'
+                                      f'输入框只显示前 {self.PREVIEW_CHARS} 个字符，点击高亮后以大文件模式显示全文，'
+                                      f'滚动到的段落才会高亮')
+                return
+            
+            # 小文件整体读入：依次尝试各编码完整解码（开头的样本不能代表全文）
             text = None
             used_encoding = None
-            
-            for encoding in encodings:
+            for encoding in TEXT_ENCODINGS:
                 try:
                     with open(filepath, 'r', encoding=encoding) as file:
                         text = file.read()
@@ -1327,6 +1711,7 @@ class WordHighlighterApp(App):
                 return
             
             text = re.sub(r'\n\s*\n', '\n\n', text)
+            self.text_source = None
             self.input_text.text = text
             self.show_popup('成功', f'TXT 文件已成功导入！\n路径：{filepath}\n编码：{used_encoding}')
         except Exception as e:
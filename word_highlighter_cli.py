@@ -0,0 +1,250 @@
+"""
+单词高亮工具 - 命令行批处理（不导入 Kivy）
+
+用法:
+    python -m word_highlighter_cli highlight --bank wordbank.txt in/*.txt --out out/
+    python -m word_highlighter_cli highlight --bank wordbank.whb --extra-bank cet4.txt --extra-bank cet6.txt \
+        books/ --out out/ --format json --jobs 4
+
+输入可以是文件或目录（目录中的 .txt 文件按相对路径输出）；多个文件时按文件分配到多个进程，
+每个进程只加载一次模型和词库。输出格式：html（带颜色的网页）、json（段落文本及单词位置）、
+kivy（与界面相同的 Kivy markup）。
+"""
+
+import argparse
+import html
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from word_highlighter_core import (
+    MarkupRenderer, ParallelHighlighter, TextFileSource, WordBank
+)
+
+FORMAT_EXTENSIONS = {'html': '.html', 'json': '.json', 'kivy': '.markup'}
+# 主词库的高亮颜色，与界面一致
+PRIMARY_COLOR = 'ff6b00'
+OUTPUT_CHUNK_CHARS = 64 * 1024
+
+
+def load_word_bank(bank_path=None, extra_banks=()):
+    """创建词库并等待模型加载结束；extra_banks 为附加词库文件路径，以文件名作为词库名"""
+    word_bank = WordBank()
+    # 批处理不修改用户的词库：不统计命中次数，多进程时也不会并发写入同一个数据库
+    word_bank.track_hits = False
+    word_bank.wait_for_model()
+    if bank_path:
+        # 批处理只读取词库，不启用变更日志
+        if not word_bank.load_word_bank(bank_path, journal=False):
+            raise ValueError(f'无法加载词库：{bank_path}')
+    for path in extra_banks:
+        name = os.path.splitext(os.path.basename(path))[0]
+        if not word_bank.load_named_bank(name, path):
+            raise ValueError(f'无法加载附加词库：{path}')
+    return word_bank
+
+
+def _write_kivy(out, results, word_bank):
+    renderer = MarkupRenderer(on_chunk=out.write, chunk_chars=OUTPUT_CHUNK_CHARS,
+                              bank_colors=word_bank.bank_colors)
+    for segments in results:
+        renderer.add_paragraph(segments)
+    renderer.flush()
+    return renderer.paragraph_count
+
+
+def _segments_html(segments, bank_colors):
+    """渲染单个段落为 HTML"""
+    fragments = []
+    append = fragments.append
+    for segment in segments:
+        text = html.escape(segment.text)
+        if segment.tag == "highlight":
+            append(f'<span class="hl" data-lemma="{html.escape(segment.lemma)}">{text}</span>')
+        elif segment.banks and bank_colors:
+            bit = (segment.banks & -segment.banks).bit_length() - 1
+            color = bank_colors[bit] if bit < len(bank_colors) else PRIMARY_COLOR
+            append(f'<span class="hl-extra" style="color:#{color}" data-lemma="{html.escape(segment.lemma)}">{text}</span>')
+        else:
+            append(text)
+    return ''.join(fragments)
+
+
+def _write_html(out, results, word_bank, title):
+    out.write('<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n')
+    out.write(f'<title>{html.escape(title)}</title>\n')
+    out.write('<style>\n'
+              f'.hl {{ color: #{PRIMARY_COLOR}; font-weight: bold; }}\n'
+              '.hl-extra { font-weight: bold; }\n'
+              'p { white-space: pre-wrap; }\n'
+              '</style>\n</head>\n<body>\n')
+    bank_colors = word_bank.bank_colors
+    count = 0
+    for segments in results:
+        out.write(f'<p>{_segments_html(segments, bank_colors)}</p>\n')
+        count += 1
+    out.write('</body>\n</html>\n')
+    return count
+
+
+def _write_json(out, results, word_bank, source):
+    """单词以 [起点, 长度, 词形, 是否在词库, 附加词库位掩码] 表示，段落文本只保存一次"""
+    banks = dict(zip(word_bank.named_banks, word_bank.bank_colors))
+    out.write('{"source": %s, "banks": %s, "paragraphs": [\n' % (
+        json.dumps(source, ensure_ascii=False), json.dumps(banks, ensure_ascii=False)))
+    count = 0
+    for segments in results:
+        words = []
+        offset = 0
+        text = []
+        for segment in segments:
+            if segment.kind == "word":
+                words.append([offset, len(segment.text), segment.lemma,
+                              1 if segment.tag == "highlight" else 0, segment.banks])
+            offset += len(segment.text)
+            text.append(segment.text)
+        if count:
+            out.write(',\n')
+        out.write(json.dumps({'text': ''.join(text), 'words': words}, ensure_ascii=False))
+        count += 1
+    out.write('\n]}\n')
+    return count
+
+
+def highlight_file(word_bank, in_path, out_path, fmt='html', encoding=None, highlighter=None):
+    """高亮一个文本文件并写出结果，返回段落数；highlighter 可指定 ParallelHighlighter"""
+    source = TextFileSource(in_path, encoding)
+    results = (highlighter or word_bank).highlight_paragraphs(p for p in source if p.strip())
+    temp_path = out_path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as out:
+        if fmt == 'kivy':
+            count = _write_kivy(out, results, word_bank)
+        elif fmt == 'json':
+            count = _write_json(out, results, word_bank, in_path)
+        else:
+            count = _write_html(out, results, word_bank, os.path.basename(in_path))
+    os.replace(temp_path, out_path)
+    return count
+
+
+def collect_inputs(paths, out_dir, fmt):
+    """展开输入文件和目录，返回 [(输入路径, 输出路径), ...]
+
+    同一个文件只处理一次；不同输入对应到同一个输出文件时（如不同目录下的同名文件）报错。
+    """
+    extension = FORMAT_EXTENSIONS[fmt]
+    pairs = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.lower().endswith('.txt'):
+                        in_path = os.path.join(root, name)
+                        relative = os.path.relpath(in_path, path)
+                        pairs.append((in_path, os.path.join(out_dir, os.path.splitext(relative)[0] + extension)))
+        else:
+            name = os.path.splitext(os.path.basename(path))[0]
+            pairs.append((path, os.path.join(out_dir, name + extension)))
+
+    unique = []
+    sources = {}  # 输出路径 -> 输入路径
+    for in_path, out_path in pairs:
+        key = os.path.normcase(os.path.abspath(out_path))
+        previous = sources.get(key)
+        if previous is None:
+            sources[key] = in_path
+            unique.append((in_path, out_path))
+        elif os.path.abspath(previous) != os.path.abspath(in_path):
+            raise ValueError(f'{previous} 和 {in_path} 的输出文件相同：{out_path}，请分别处理或放到不同目录中')
+    return unique
+
+
+# 工作进程中的词库（每个进程初始化时加载一次）
+_worker_bank = None
+
+
+def _init_worker(bank_path, extra_banks):
+    global _worker_bank
+    _worker_bank = load_word_bank(bank_path, extra_banks)
+
+
+def _process_file(in_path, out_path, fmt, encoding, highlighter=None):
+    start = time.perf_counter()
+    count = highlight_file(_worker_bank, in_path, out_path, fmt, encoding, highlighter)
+    return count, time.perf_counter() - start
+
+
+def run_highlight(args):
+    """执行 highlight 子命令，返回退出码"""
+    pairs = collect_inputs(args.inputs, args.out, args.format)
+    if not pairs:
+        print('没有找到要处理的文件')
+        return 1
+    for _, out_path in pairs:
+        os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+
+    jobs = min(args.jobs or os.cpu_count() or 1, len(pairs))
+    start = time.perf_counter()
+    failed = 0
+    if jobs > 1 and ParallelHighlighter.available():
+        print(f'[调试] 使用 {jobs} 个进程处理 {len(pairs)} 个文件')
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(args.bank, args.extra_bank)) as executor:
+            futures = {executor.submit(_process_file, in_path, out_path, args.format, args.encoding): (in_path, out_path)
+                       for in_path, out_path in pairs}
+            for future in as_completed(futures):
+                in_path, out_path = futures[future]
+                try:
+                    count, elapsed = future.result()
+                    print(f'[完成] {in_path} -> {out_path}（{count} 段，{elapsed:.2f} 秒）')
+                except Exception as e:
+                    failed += 1
+                    print(f'处理 {in_path} 出错: {e}')
+    else:
+        _init_worker(args.bank, args.extra_bank)
+        # 只有一个文件时改为在段落批次间并行（spaCy 模式下才有收益）
+        highlighter = None
+        if (args.jobs or os.cpu_count() or 1) > 1 and _worker_bank.nlp is not None and ParallelHighlighter.available():
+            highlighter = ParallelHighlighter(_worker_bank, args.jobs or None)
+        try:
+            for in_path, out_path in pairs:
+                try:
+                    count, elapsed = _process_file(in_path, out_path, args.format, args.encoding, highlighter)
+                    print(f'[完成] {in_path} -> {out_path}（{count} 段，{elapsed:.2f} 秒）')
+                except Exception as e:
+                    failed += 1
+                    print(f'处理 {in_path} 出错: {e}')
+        finally:
+            if highlighter is not None:
+                highlighter.close()
+
+    print(f'共处理 {len(pairs) - failed}/{len(pairs)} 个文件，耗时 {time.perf_counter() - start:.2f} 秒')
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='单词高亮工具命令行批处理（不需要 Kivy）')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    highlight = subparsers.add_parser('highlight', help='高亮文本文件')
+    highlight.add_argument('inputs', nargs='+', help='输入的 TXT 文件或目录')
+    highlight.add_argument('--bank', help='主词库文件（文本、.whb 二进制或 SQLite 数据库）')
+    highlight.add_argument('--extra-bank', action='append', default=[], help='附加词库文件，可重复指定')
+    highlight.add_argument('--out', required=True, help='输出目录')
+    highlight.add_argument('--format', choices=sorted(FORMAT_EXTENSIONS), default='html', help='输出格式')
+    highlight.add_argument('--jobs', type=int, default=0, help='并行进程数（默认等于 CPU 核数）')
+    highlight.add_argument('--encoding', help='输入文件编码（默认自动检测）')
+    args = parser.parse_args(argv)
+
+    try:
+        return run_highlight(args)
+    except ValueError as e:
+        print(f'错误: {e}')
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
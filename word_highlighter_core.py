@@ -0,0 +1,2545 @@
+"""
+单词高亮工具 - 高亮核心（不依赖 Kivy）
+
+词库存储、词形还原、分段高亮和 markup 渲染等与界面无关的部分，
+供 Kivy 界面（word_highlighter_android.py）和命令行批处理（word_highlighter_cli.py）共用。
+"""
+
+import threading
+import os
+import sys
+import time
+import re
+import codecs
+import mmap
+import math
+import hashlib
+import json
+import multiprocessing
+import struct
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from collections import Counter, OrderedDict, deque, namedtuple
+from html.parser import HTMLParser
+from importlib.util import find_spec
+
+
+def _detect_platform():
+    """检测运行平台，取值与 kivy.utils.platform 一致，但不需要导入 Kivy"""
+    if 'ANDROID_ARGUMENT' in os.environ or 'P4A_BOOTSTRAP' in os.environ:
+        return 'android'
+    if os.environ.get('KIVY_BUILD', '') == 'ios':
+        return 'ios'
+    if sys.platform in ('win32', 'cygwin'):
+        return 'win'
+    if sys.platform == 'darwin':
+        return 'macosx'
+    if sys.platform.startswith(('linux', 'freebsd')):
+        return 'linux'
+    return 'unknown'
+
+
+platform = _detect_platform()
+
+
+# 较重的模块（requests、googletrans、spacy）在首次使用时才导入，缩短启动时间
+def get_requests():
+    """首次使用时导入 requests"""
+    import requests
+    return requests
+
+
+# 翻译功能：只检查 googletrans 是否已安装，Translator 在第一次翻译时创建
+_TRANSLATOR_AVAILABLE = find_spec('googletrans') is not None
+_translator = None
+_translator_lock = threading.Lock()
+
+
+def get_translator():
+    """首次翻译时创建 googletrans Translator，失败时返回 None"""
+    global _translator, _TRANSLATOR_AVAILABLE
+    with _translator_lock:
+        if _translator is None and _TRANSLATOR_AVAILABLE:
+            try:
+                from googletrans import Translator as GoogleTranslator
+                _translator = GoogleTranslator()
+            except Exception as e:
+                print(f"初始化翻译功能出错: {e}")
+                _TRANSLATOR_AVAILABLE = False
+        return _translator
+
+
+def translator_available():
+    """googletrans 是否可用（首次创建 Translator 失败后返回 False）"""
+    return _TRANSLATOR_AVAILABLE
+
+
+class HtmlTextExtractor(HTMLParser):
+    """增量式 HTML 正文提取：去掉脚本、样式、导航等非正文元素，按块级元素分段
+
+    可分多次 feed()；段落内的连续空白合并为一个空格。
+    """
+    # 内容整体丢弃的元素（form、button 常包住正文或缺少结束标签，不在其中）
+    SKIP_TAGS = frozenset((
+        'head', 'script', 'style', 'noscript', 'template', 'svg', 'math', 'canvas', 'object',
+        'iframe', 'nav', 'header', 'footer', 'aside', 'select', 'menu',
+    ))
+    # 开始或结束时另起一段的元素
+    BLOCK_TAGS = frozenset((
+        'p', 'div', 'section', 'article', 'main', 'br', 'hr', 'li', 'ul', 'ol', 'dl', 'dt', 'dd',
+        'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'blockquote', 'pre', 'table', 'tr', 'caption',
+        'figcaption', 'address', 'details', 'summary', 'body',
+    ))
+    # 单元格之间只插入空格
+    CELL_TAGS = frozenset(('td', 'th'))
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.paragraphs = []
+        self._buffer = []
+        self._skipping = []  # 尚未结束的被丢弃元素
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'body':
+            # 正文开始：未闭合的 head 等被丢弃元素到此结束
+            self._skipping.clear()
+        if tag in self.SKIP_TAGS:
+            self._skipping.append(tag)
+        elif self._skipping:
+            return
+        elif tag in self.BLOCK_TAGS:
+            self._end_paragraph()
+        elif tag in self.CELL_TAGS:
+            self._buffer.append(' ')
+
+    def handle_startendtag(self, tag, attrs):
+        # <br/> 等自闭合标签不会有结束标签，不能压入丢弃栈
+        if not self._skipping and tag in self.BLOCK_TAGS:
+            self._end_paragraph()
+
+    def handle_endtag(self, tag):
+        if self._skipping:
+            if tag in self._skipping:
+                # 容忍未闭合的嵌套元素：弹出到对应的开始标签为止
+                while self._skipping.pop() != tag:
+                    pass
+            elif tag in ('body', 'html'):
+                self._skipping.clear()
+            return
+        if tag in self.BLOCK_TAGS:
+            self._end_paragraph()
+
+    def handle_data(self, data):
+        if not self._skipping:
+            self._buffer.append(data)
+
+    def _end_paragraph(self):
+        if self._buffer:
+            text = ' '.join(''.join(self._buffer).split())
+            self._buffer = []
+            if text:
+                self.paragraphs.append(text)
+
+    def close(self):
+        super().close()
+        self._end_paragraph()
+
+
+def html_to_text(html, chunk_chars=64 * 1024):
+    """把 HTML 文本分块送入 HtmlTextExtractor，返回以空行分隔段落的正文"""
+    extractor = HtmlTextExtractor()
+    for start in range(0, len(html), chunk_chars):
+        extractor.feed(html[start:start + chunk_chars])
+    extractor.close()
+    return '\n\n'.join(extractor.paragraphs)
+
+
+class PageCache:
+    """网页的磁盘缓存：按 URL 保存响应正文及 ETag/Last-Modified，总大小超过上限时按最近最少使用淘汰
+
+    每个条目对应两个文件：<key>.body（原始字节）和 <key>.json（元数据），key 为 URL 的哈希。
+    """
+    DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> 元数据，按最近使用排序
+        self.total_bytes = 0
+        # 已有条目在第一次使用时才读取，创建缓存（应用启动时）不做磁盘扫描
+        self._scanned = False
+
+    @staticmethod
+    def key(url):
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    def _path(self, key, suffix):
+        return os.path.join(self.cache_dir, key + suffix)
+
+    def _ensure_scanned(self):
+        """首次使用时建立缓存目录并读取已有条目，调用方需持有锁"""
+        if not self._scanned:
+            self._scanned = True
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._scan()
+
+    def _scan(self):
+        """读取已有条目，按上次访问时间恢复 LRU 顺序"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            key = name[:-len('.json')]
+            try:
+                with open(self._path(key, '.json'), 'r', encoding='utf-8') as file:
+                    meta = json.load(file)
+                entries.append((meta.get('accessed', 0), key, meta))
+            except Exception as e:
+                print(f"读取网页缓存条目出错: {e}")
+        for _, key, meta in sorted(entries, key=lambda entry: entry[0]):
+            self._entries[key] = meta
+            self.total_bytes += meta.get('size', 0)
+
+    def get(self, url):
+        """返回 (元数据, 正文字节)，未缓存时返回 None"""
+        key = self.key(url)
+        with self._lock:
+            self._ensure_scanned()
+            meta = self._entries.get(key)
+            if meta is None or meta.get('url') != url:
+                return None
+            self._entries.move_to_end(key)
+        try:
+            with open(self._path(key, '.body'), 'rb') as file:
+                return meta, file.read()
+        except OSError:
+            self.remove(url)
+            return None
+
+    def touch(self, url):
+        """记录一次命中（如服务器返回 304），更新 LRU 顺序和访问时间"""
+        key = self.key(url)
+        with self._lock:
+            self._ensure_scanned()
+            meta = self._entries.get(key)
+            if meta is None:
+                return
+            self._entries.move_to_end(key)
+            meta['accessed'] = time.time()
+            self._write_meta(key, meta)
+
+    def put(self, url, body, etag=None, last_modified=None, encoding=None):
+        """保存响应，超出容量时淘汰最久未使用的条目"""
+        if len(body) > self.max_bytes:
+            return False
+        key = self.key(url)
+        meta = {'url': url, 'etag': etag, 'last_modified': last_modified, 'encoding': encoding,
+                'size': len(body), 'accessed': time.time()}
+        try:
+            with self._lock:
+                self._ensure_scanned()
+            temp_path = self._path(key, '.body.tmp')
+            with open(temp_path, 'wb') as file:
+                file.write(body)
+            os.replace(temp_path, self._path(key, '.body'))
+            with self._lock:
+                old = self._entries.pop(key, None)
+                if old is not None:
+                    self.total_bytes -= old.get('size', 0)
+                self._entries[key] = meta
+                self.total_bytes += len(body)
+                self._write_meta(key, meta)
+                self._evict()
+            return True
+        except Exception as e:
+            print(f"写入网页缓存出错: {e}")
+            return False
+
+    def remove(self, url):
+        key = self.key(url)
+        with self._lock:
+            self._ensure_scanned()
+            meta = self._entries.pop(key, None)
+            if meta is not None:
+                self.total_bytes -= meta.get('size', 0)
+                self._delete_files(key)
+
+    def _write_meta(self, key, meta):
+        with open(self._path(key, '.json'), 'w', encoding='utf-8') as file:
+            json.dump(meta, file)
+
+    def _delete_files(self, key):
+        for suffix in ('.json', '.body'):
+            try:
+                os.remove(self._path(key, suffix))
+            except OSError:
+                pass
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and self._entries:
+            key, meta = self._entries.popitem(last=False)
+            self.total_bytes -= meta.get('size', 0)
+            self._delete_files(key)
+            print(f"[调试] 网页缓存淘汰: {meta.get('url')}")
+
+    def __len__(self):
+        with self._lock:
+            self._ensure_scanned()
+            return len(self._entries)
+
+
+class WebFetcher:
+    """共享 requests.Session（保持连接复用）并带磁盘缓存的网页获取
+
+    已缓存且有 ETag/Last-Modified 的网址以条件请求重新验证，服务器返回 304 时直接使用缓存；
+    网络不可用时退回到缓存的旧内容。session 可由调用方传入（如测试时）。
+    """
+    TIMEOUT = 10
+    POOL_SIZE = 4
+    CHUNK_SIZE = 64 * 1024
+    USER_AGENT = 'WordHighlighter/1.0'
+    _META_CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?([A-Za-z0-9_.:-]+)', re.IGNORECASE)
+
+    def __init__(self, cache_dir=None, max_cache_bytes=PageCache.DEFAULT_MAX_BYTES, session=None, timeout=TIMEOUT):
+        self.cache = PageCache(cache_dir, max_cache_bytes) if cache_dir else None
+        self.timeout = timeout
+        self._session = session
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        """首次使用时创建 Session（同时导入 requests）"""
+        with self._session_lock:
+            if self._session is None:
+                requests = get_requests()
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=self.POOL_SIZE, pool_maxsize=self.POOL_SIZE)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers['User-Agent'] = self.USER_AGENT
+                self._session = session
+            return self._session
+
+    @staticmethod
+    def _decoder(encoding):
+        """返回增量解码器，分块边界上被截断的多字节字符留到下一块解码"""
+        try:
+            return codecs.getincrementaldecoder(encoding or 'utf-8')(errors='replace')
+        except LookupError:
+            return codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+    def fetch(self, url, max_bytes=None):
+        """获取网页，返回 (文本, 是否来自缓存)，请求失败且没有缓存时抛出异常
+
+        正文按块流式下载，指定 max_bytes 时读到上限即停止（被截断的网页不写入缓存）。
+        """
+        pieces = []
+        from_cache = self._fetch(url, max_bytes, pieces.append)
+        return ''.join(pieces), from_cache
+
+    def fetch_text(self, url, max_bytes=None):
+        """获取网页并提取正文，返回 (以空行分隔段落的正文, 是否来自缓存)
+
+        下载的数据块解码后直接送入 HtmlTextExtractor，边下载边解析，不拼接整页 HTML。
+        """
+        extractor = HtmlTextExtractor()
+        from_cache = self._fetch(url, max_bytes, extractor.feed)
+        extractor.close()
+        return '\n\n'.join(extractor.paragraphs), from_cache
+
+    def _fetch(self, url, max_bytes, on_text):
+        """请求网页并把解码后的文本逐块交给 on_text，返回是否来自缓存"""
+        cached = self.cache.get(url) if self.cache is not None else None
+        headers = {}
+        if cached:
+            meta = cached[0]
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+        try:
+            # 流式请求：正文在 _read_body 中按块读取，下载上限才真正生效
+            response = self.session.get(url, timeout=self.timeout, headers=headers, stream=True)
+        except Exception as e:
+            if cached:
+                print(f"[调试] 网络请求失败（{e}），使用缓存: {url}")
+                self._feed_cached(cached, max_bytes, on_text)
+                return True
+            raise
+        if response.status_code == 304 and cached:
+            response.close()
+            print(f"[调试] 网页未修改，使用缓存: {url}")
+            self.cache.touch(url)
+            self._feed_cached(cached, max_bytes, on_text)
+            return True
+        if not response.ok:
+            response.close()
+        response.raise_for_status()
+        body, truncated, encoding = self._read_body(response, max_bytes, on_text)
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if self.cache is not None and not truncated:
+            # 没有校验信息的响应无法重新验证，不缓存
+            if etag or last_modified:
+                self.cache.put(url, body, etag, last_modified, encoding)
+            elif cached:
+                self.cache.remove(url)
+        return False
+
+    def _feed_cached(self, cached, max_bytes, on_text):
+        """把缓存的正文按块解码后交给 on_text"""
+        meta, body = cached
+        end = len(body) if max_bytes is None else min(len(body), max_bytes)
+        decoder = self._decoder(meta.get('encoding'))
+        view = memoryview(body)
+        for start in range(0, end, self.CHUNK_SIZE):
+            on_text(decoder.decode(view[start:min(end, start + self.CHUNK_SIZE)]))
+        on_text(decoder.decode(b'', final=True))
+
+    @classmethod
+    def _sniff_encoding(cls, sample):
+        """响应头未指定编码时，按网页 <meta> 中声明的编码或字节样本检测"""
+        match = cls._META_CHARSET_RE.search(sample)
+        if match:
+            return match.group(1).decode('ascii')
+        return detect_sample_encoding(sample) or 'utf-8'
+
+    def _read_body(self, response, max_bytes, on_text):
+        """按块读取响应正文并解码交给 on_text，返回 (字节, 是否被截断, 编码)
+
+        只有启用缓存时才保留原始字节（用于写入缓存），否则返回的字节为空。
+        """
+        parts = [] if self.cache is not None else None
+        size = 0
+        truncated = False
+        encoding = response.encoding
+        decoder = self._decoder(encoding) if encoding else None
+        pending = []  # 编码确定之前收到的数据块（流式读取时无法使用需要完整 content 的 apparent_encoding）
+
+        def emit(chunk, last=False):
+            nonlocal decoder, encoding
+            if decoder is None:
+                pending.append(chunk)
+                sample = b''.join(pending)
+                if len(sample) < self.CHUNK_SIZE and not last:
+                    return
+                pending.clear()
+                encoding = self._sniff_encoding(sample)
+                decoder = self._decoder(encoding)
+                chunk = sample
+            # 被截断时末尾不完整的多字节字符直接丢弃
+            on_text(decoder.decode(chunk, last and not truncated))
+
+        try:
+            chunks = response.iter_content(chunk_size=self.CHUNK_SIZE)
+            for chunk in chunks:
+                if max_bytes is not None and size + len(chunk) > max_bytes:
+                    chunk = chunk[:max_bytes - size]
+                    truncated = True
+                emit(chunk)
+                if parts is not None:
+                    parts.append(chunk)
+                size += len(chunk)
+                if max_bytes is not None and size >= max_bytes:
+                    # 读满上限后再取一块：还有数据就是被截断（包括恰好在块边界读满的情况）
+                    truncated = truncated or next(chunks, None) is not None
+                    break
+        finally:
+            response.close()
+        emit(b'', last=True)
+        return b''.join(parts) if parts is not None else b'', truncated, encoding
+
+    def close(self):
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+# 高亮分段：文本、标记（highlight/normal）、词形（非单词为 None）、类别（word/space/punct）、
+# 所属附加词库的位掩码（第 i 位对应第 i 个附加词库）
+Segment = namedtuple('Segment', 'text tag lemma kind banks', defaults=(0,))
+
+
+def _bank_color(banks, bank_colors):
+    """返回位掩码中最低位附加词库的颜色，没有对应颜色时返回 None"""
+    bit = (banks & -banks).bit_length() - 1
+    return bank_colors[bit] if 0 <= bit < len(bank_colors) else None
+
+
+def _gap_kind(text):
+    """判断非单词片段的类别"""
+    return "space" if text.isspace() else "punct"
+
+
+# 简化模式分词：字母单词（可由撇号、连字符连接，如 don't、well-known）、空白、其余字符（标点、数字）
+_TOKEN_RE = re.compile(
+    r"(?P<word>[^\W\d_]+(?:['’-][^\W\d_]+)*)"
+    r"|(?P<space>\s+)"
+    r"|(?P<punct>(?:[^\w\s]|[\d_])+)"
+)
+
+
+def iter_token_spans(text):
+    """单次扫描文本，逐个产出 (start, end, kind)，kind 为 word/space/punct"""
+    for match in _TOKEN_RE.finditer(text):
+        start, end = match.span()
+        yield start, end, match.lastgroup
+
+
+def _strip_possessive(word):
+    """去掉所有格后缀：teacher's -> teacher"""
+    if word[-2:] in ("'s", "’s", "'S", "’S"):
+        return word[:-2]
+    return word
+
+
+def _escape_markup(text):
+    """转义 Kivy markup 中的特殊字符"""
+    return text.replace('&', '&amp;').replace('[', '&bl;').replace(']', '&br;')
+
+
+class MarkupRenderer:
+    """高亮分段的 markup 渲染器：片段先收集到列表，最后一次性拼接
+
+    指定 on_chunk 时以流式方式输出：chunk_chars 为 0 时每个段落输出一块，
+    否则累计达到 chunk_chars 个字符输出一块，已输出的内容不再保留。
+    paragraph_separator 为空时段落之间不插入分隔符（由界面按段落分项显示）。
+    """
+    PARAGRAPH_SEPARATOR = '\n\n'
+
+    def __init__(self, on_chunk=None, chunk_chars=0, paragraph_separator=PARAGRAPH_SEPARATOR, bank_colors=()):
+        self.on_chunk = on_chunk
+        self.chunk_chars = chunk_chars
+        self.paragraph_separator = paragraph_separator
+        self.bank_colors = bank_colors
+        self.word_count = 0  # 用于唯一标识每个单词
+        self.paragraph_count = 0
+        self._chunks = []
+        self._pending = []
+        self._pending_chars = 0
+
+    @staticmethod
+    def plain_markup(text):
+        """未高亮的纯文本 markup（如等待后台高亮时的占位内容）"""
+        return _escape_markup(text)
+
+    @staticmethod
+    def paragraph_markup(segments, word_count=0, bank_colors=()):
+        """渲染单个段落，返回 (markup, 渲染后的单词计数)"""
+        fragments = []
+        append = fragments.append
+        for segment, tag, lemma, kind, banks in segments:
+            if tag == "highlight":
+                # 使用 Kivy ref 标签实现可点击的高亮（已在词库）
+                append(f'[b][color=ff6b00][ref={lemma}_{word_count}_IN]{_escape_markup(segment)}[/ref][/color][/b]')
+                word_count += 1
+            elif banks and bank_colors:
+                # 只在附加词库中的单词按所属词库着色，点击仍可添加到词库
+                color = _bank_color(banks, bank_colors)
+                append(f'[b][color={color}][ref={lemma}_{word_count}_OUT]{_escape_markup(segment)}[/ref][/color][/b]')
+                word_count += 1
+            elif kind == "word":
+                # 未在词库的单词直接使用分段自带的词形，添加可点击功能
+                append(f'[ref={lemma}_{word_count}_OUT]{_escape_markup(segment)}[/ref]')
+                word_count += 1
+            else:
+                append(_escape_markup(segment))
+        return ''.join(fragments), word_count
+
+    def add_paragraph(self, segments):
+        """追加一个段落"""
+        markup, self.word_count = self.paragraph_markup(segments, self.word_count, self.bank_colors)
+        if self.paragraph_count and self.paragraph_separator:
+            self._pending.append(self.paragraph_separator)
+        self._pending.append(markup)
+        self._pending_chars += len(markup)
+        self.paragraph_count += 1
+        if self.on_chunk and self._pending_chars >= self.chunk_chars:
+            self.flush()
+
+    def flush(self):
+        """输出（或暂存）当前累积的片段"""
+        if not self._pending:
+            return
+        chunk = ''.join(self._pending)
+        self._pending = []
+        self._pending_chars = 0
+        if self.on_chunk:
+            self.on_chunk(chunk)
+        else:
+            self._chunks.append(chunk)
+
+    def getvalue(self):
+        """返回完整 markup（流式输出时只包含尚未输出的部分）"""
+        self.flush()
+        if self.on_chunk:
+            return ''
+        markup = ''.join(self._chunks)
+        self._chunks = [markup]
+        return markup
+
+
+class HighlightDocument:
+    """已高亮文档的分段及词形 → 单词位置索引
+
+    词库变化时只修补受影响的分段，并返回需要重新渲染的段落，无需再次进行词形还原。
+    """
+    def __init__(self):
+        self.paragraphs = []  # 每个段落的分段列表
+        self.word_counts = []  # 每个段落第一个单词的 ref 编号
+        self.lemma_positions = {}  # 词形 -> [(段落序号, 分段序号), ...]
+        self.bank_colors = ()  # 附加词库颜色，按位序排列
+
+    def __len__(self):
+        return len(self.paragraphs)
+
+    def add_paragraph(self, segments, word_count):
+        """登记一个已高亮的段落，word_count 为渲染该段落前的单词计数"""
+        index = len(self.paragraphs)
+        self.paragraphs.append(segments)
+        self.word_counts.append(word_count)
+        positions = self.lemma_positions
+        for j, segment in enumerate(segments):
+            if segment.kind == "word":
+                positions.setdefault(segment.lemma, []).append((index, j))
+        return index
+
+    def set_lemma_state(self, lemma, in_bank, banks=None):
+        """切换某个词形的高亮状态（banks 不为 None 时同时更新附加词库位掩码），返回受影响的段落序号（升序）"""
+        tag = "highlight" if in_bank else "normal"
+        touched = set()
+        for index, j in self.lemma_positions.get(lemma, ()):
+            segments = self.paragraphs[index]
+            segment = segments[j]
+            if segment.tag != tag or (banks is not None and segment.banks != banks):
+                segments[j] = segment._replace(tag=tag, banks=segment.banks if banks is None else banks)
+                touched.add(index)
+        return sorted(touched)
+
+    def apply_bank(self, words, bank_masks=None, bank_colors=None):
+        """按整个词库（及附加词库索引）重新计算所有单词的高亮状态，返回受影响的段落序号"""
+        touched = set()
+        if bank_colors is not None and bank_colors != self.bank_colors:
+            # 附加词库颜色变化时所有段落都需要重新渲染
+            self.bank_colors = bank_colors
+            touched.update(range(len(self.paragraphs)))
+        for lemma in self.lemma_positions:
+            banks = None if bank_masks is None else bank_masks.get(lemma, 0)
+            touched.update(self.set_lemma_state(lemma, lemma in words, banks))
+        return sorted(touched)
+
+    def paragraph_markup(self, index):
+        """重新渲染一个段落，单词 ref 编号保持不变"""
+        markup, _ = MarkupRenderer.paragraph_markup(self.paragraphs[index], self.word_counts[index], self.bank_colors)
+        return markup
+
+
+class BinaryWordList:
+    """二进制词库文件的只读视图
+
+    文件格式（小端）：头部（魔数 WHBK、版本、标志、单词数、CRC32），
+    count + 1 个 uint32 偏移，随后是按字母顺序拼接的 UTF-8 单词。
+    一次读取（或 mmap）即可使用，查找直接在偏移表上二分，无需先构建 set。
+    """
+    MAGIC = b'WHBK'
+    VERSION = 1
+    EXTENSION = '.whb'
+    _HEADER = struct.Struct('<4sHHII')
+
+    def __init__(self, data, verify=True):
+        header = self._HEADER
+        if len(data) < header.size:
+            raise ValueError('二进制词库文件不完整')
+        magic, version, _flags, count, checksum = header.unpack_from(data, 0)
+        if magic != self.MAGIC:
+            raise ValueError('不是二进制词库文件')
+        if version != self.VERSION:
+            raise ValueError(f'不支持的二进制词库版本: {version}')
+        body = memoryview(data)[header.size:]
+        if verify and zlib.crc32(body) != checksum:
+            raise ValueError('二进制词库校验失败，文件可能已损坏')
+        offsets_size = 4 * (count + 1)
+        self._offsets = array('I')
+        self._offsets.frombytes(body[:offsets_size])
+        if sys.byteorder == 'big':
+            self._offsets.byteswap()
+        self._blob = body[offsets_size:]
+        self._data = data
+
+    @classmethod
+    def is_binary_file(cls, filepath):
+        """根据文件头判断是否为二进制词库"""
+        with open(filepath, 'rb') as file:
+            return file.read(len(cls.MAGIC)) == cls.MAGIC
+
+    @classmethod
+    def load(cls, filepath, use_mmap=False, verify=True):
+        """一次读取整个文件（或映射到内存）"""
+        with open(filepath, 'rb') as file:
+            if use_mmap:
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                data = file.read()
+        return cls(data, verify)
+
+    @classmethod
+    def write(cls, filepath, words):
+        """把已排序的单词写成二进制词库，先写临时文件再替换"""
+        encoded = [word.encode('utf-8') for word in words]
+        offsets = array('I', [0])
+        total = 0
+        for item in encoded:
+            total += len(item)
+            offsets.append(total)
+        if sys.byteorder == 'big':
+            offsets.byteswap()
+        body = offsets.tobytes() + b''.join(encoded)
+        header = cls._HEADER.pack(cls.MAGIC, cls.VERSION, 0, len(encoded), zlib.crc32(body))
+        temp_path = filepath + '.tmp'
+        with open(temp_path, 'wb') as file:
+            file.write(header)
+            file.write(body)
+        os.replace(temp_path, filepath)
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def _raw(self, index):
+        return bytes(self._blob[self._offsets[index]:self._offsets[index + 1]])
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._raw(i).decode('utf-8') for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self._raw(index).decode('utf-8')
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self._raw(index).decode('utf-8')
+
+    def __contains__(self, word):
+        """二分查找（UTF-8 字节序与字符串排序一致）"""
+        target = word.encode('utf-8')
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._raw(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo < len(self) and self._raw(lo) == target
+
+
+class WordBankJournal:
+    """词库变更日志：增删记录以 O(1) 追加到词库文件旁的日志中
+
+    每条记录立即写入操作系统（应用被杀也不丢失），每累计 FSYNC_EVERY 条或间隔
+    FSYNC_INTERVAL 秒 fsync 一次；记录数超过 COMPACT_THRESHOLD 时在后台把日志合并进词库快照。
+    """
+    SUFFIX = '.journal'
+    COMPACTING_SUFFIX = '.journal.compacting'
+    FSYNC_EVERY = 32
+    FSYNC_INTERVAL = 2.0
+    COMPACT_THRESHOLD = 5000
+
+    def __init__(self, bank_path, snapshot_words, write_snapshot):
+        # snapshot_words() 返回当前词库的有序单词列表，write_snapshot(path, words) 写入快照
+        self.bank_path = bank_path
+        self.path = bank_path + self.SUFFIX
+        self.snapshot_words = snapshot_words
+        self.write_snapshot = write_snapshot
+        self._lock = threading.Lock()
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self.entries = self._count_entries(self.path)
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._compactor = None
+        self._compact_again = False  # 合并进行中又请求了合并（如显式保存），结束后再合并一次
+
+    @staticmethod
+    def _count_entries(path):
+        with open(path, 'r', encoding='utf-8') as file:
+            return sum(1 for _ in file)
+
+    @classmethod
+    def has_entries(cls, bank_path):
+        """是否有尚未合并的日志记录"""
+        for path in (bank_path + cls.COMPACTING_SUFFIX, bank_path + cls.SUFFIX):
+            if os.path.exists(path) and os.path.getsize(path) > 0:
+                return True
+        return False
+
+    @classmethod
+    def replay(cls, bank_path, words):
+        """把尚未合并的日志（先合并中的旧日志，再当前日志）依次应用到 words，返回记录数"""
+        count = 0
+        for path in (bank_path + cls.COMPACTING_SUFFIX, bank_path + cls.SUFFIX):
+            if not os.path.exists(path):
+                continue
+            with open(path, 'r', encoding='utf-8') as file:
+                for line in file:
+                    op, word = line[:1], line[1:].rstrip('\n')
+                    if not word:
+                        continue
+                    if op == '+':
+                        words.add(word)
+                    elif op == '-':
+                        words.discard(word)
+                    count += 1
+        return count
+
+    def record(self, op, word):
+        """追加一条记录，op 为 '+'（添加）或 '-'（删除）"""
+        with self._lock:
+            self._file.write(f'{op}{word}\n')
+            self._file.flush()
+            self.entries += 1
+            self._unsynced += 1
+            if (self._unsynced >= self.FSYNC_EVERY or
+                    time.monotonic() - self._last_sync >= self.FSYNC_INTERVAL):
+                self._sync_locked()
+            if self.entries >= self.COMPACT_THRESHOLD and self._compactor is None:
+                self._start_compaction_locked()
+
+    def sync(self):
+        """把已写入的记录刷到磁盘"""
+        with self._lock:
+            self._sync_locked()
+
+    def _sync_locked(self):
+        if self._unsynced:
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _start_compaction_locked(self):
+        """截取当前词库并轮换日志，快照在后台线程写入"""
+        words = self.snapshot_words()
+        self._sync_locked()
+        self._file.close()
+        compacting_path = self.bank_path + self.COMPACTING_SUFFIX
+        if os.path.exists(compacting_path):
+            # 上一次合并未完成，把旧日志并入本次合并
+            with open(compacting_path, 'a', encoding='utf-8') as old, \
+                    open(self.path, 'r', encoding='utf-8') as current:
+                old.write(current.read())
+            os.remove(self.path)
+        else:
+            os.replace(self.path, compacting_path)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self.entries = 0
+        self._compactor = threading.Thread(target=self._compact, args=(words, compacting_path), daemon=True)
+        self._compactor.start()
+
+    def _compact(self, words, compacting_path):
+        try:
+            self.write_snapshot(self.bank_path, words)
+            os.remove(compacting_path)
+            print(f"[调试] 词库日志已合并: {self.bank_path}（{len(words)} 个单词）")
+        except Exception as e:
+            # 合并失败时保留旧日志，下次加载仍会重放
+            print(f"合并词库日志出错: {e}")
+        finally:
+            with self._lock:
+                self._compactor = None
+                if self._compact_again and self.entries:
+                    self._start_compaction_locked()
+                self._compact_again = False
+
+    def compact(self, wait=False):
+        """立即合并日志（快照在后台写入），wait=True 时等待合并完成"""
+        with self._lock:
+            if self._compactor is None:
+                if self.entries:
+                    self._start_compaction_locked()
+            elif self.entries:
+                # 正在合并的快照不含之后的修改
+                self._compact_again = True
+        if wait:
+            self._wait_compaction()
+
+    def _wait_compaction(self):
+        # 合并结束时可能紧接着开始下一次合并
+        compactor = self._compactor
+        while compactor is not None:
+            compactor.join()
+            compactor = self._compactor
+
+    def reset(self):
+        """快照已包含全部修改时清空日志"""
+        with self._lock:
+            self._file.close()
+            self._file = open(self.path, 'w', encoding='utf-8')
+            self.entries = 0
+            self._unsynced = 0
+
+    def close(self):
+        """同步并关闭日志（等待进行中的合并完成）"""
+        self._wait_compaction()
+        with self._lock:
+            self._sync_locked()
+            self._file.close()
+
+
+class SortedWordIndex:
+    """词库的有序索引：二分定位、前缀搜索和分页的子串搜索，增删时不整体重排"""
+    def __init__(self, words=(), presorted=False):
+        # presorted 表示 words 已去重并排好序，跳过排序；二进制词库直接作为只读列表使用，首次修改时才复制
+        if isinstance(words, BinaryWordList):
+            self._words = words
+        else:
+            self._words = list(words) if presorted else sorted(set(words))
+        # 子串搜索用的拼接文本及每个单词的起始偏移，变更后按需重建
+        self._blob = None
+        self._offsets = None
+
+    def __len__(self):
+        return len(self._words)
+
+    def __iter__(self):
+        return iter(self._words)
+
+    def __contains__(self, word):
+        return self.index(word) >= 0
+
+    def __getitem__(self, index):
+        return self._words[index]
+
+    def add(self, word):
+        """插入单词，已存在返回 False"""
+        i = bisect_left(self._words, word)
+        if i < len(self._words) and self._words[i] == word:
+            return False
+        self._writable().insert(i, word)
+        self._blob = None
+        return True
+
+    def discard(self, word):
+        """删除单词，不存在返回 False"""
+        i = self.index(word)
+        if i < 0:
+            return False
+        del self._writable()[i]
+        self._blob = None
+        return True
+
+    def _writable(self):
+        if not isinstance(self._words, list):
+            self._words = list(self._words)
+        return self._words
+
+    def index(self, word):
+        """返回单词在有序列表中的位置，不存在返回 -1"""
+        i = bisect_left(self._words, word)
+        if i < len(self._words) and self._words[i] == word:
+            return i
+        return -1
+
+    def prefix_range(self, prefix):
+        """返回以 prefix 开头的单词所在的下标区间 [lo, hi)"""
+        if not prefix:
+            return 0, len(self._words)
+        lo = bisect_left(self._words, prefix)
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        hi = bisect_left(self._words, upper, lo)
+        return lo, hi
+
+    def page(self, start='', limit=None, inclusive=True):
+        """返回从 start 开始（inclusive=False 时不含 start）的最多 limit 个单词"""
+        lo = (bisect_left if inclusive else bisect_right)(self._words, start)
+        hi = len(self._words) if limit is None else min(len(self._words), lo + limit)
+        return self._words[lo:hi]
+
+    def prefix_search(self, prefix, start=0, limit=None):
+        """前缀搜索，返回分页后的单词列表"""
+        lo, hi = self.prefix_range(prefix)
+        lo += start
+        if limit is not None:
+            hi = min(hi, lo + limit)
+        return self._words[lo:hi]
+
+    def search(self, keyword, start=0, limit=None):
+        """子串搜索，返回分页后的匹配下标列表（按字母顺序）"""
+        self._ensure_blob()
+        blob, offsets = self._blob, self._offsets
+        matches = []
+        skipped = 0
+        pos = blob.find(keyword)
+        while pos >= 0:
+            i = bisect_right(offsets, pos) - 1
+            if skipped < start:
+                skipped += 1
+            else:
+                matches.append(i)
+                if limit is not None and len(matches) >= limit:
+                    break
+            # 同一个单词只计一次，从下一个单词开头继续查找
+            if i + 1 >= len(offsets):
+                break
+            pos = blob.find(keyword, offsets[i + 1])
+        return matches
+
+    def _ensure_blob(self):
+        if self._blob is not None:
+            return
+        offsets = array('l')
+        pos = 0
+        for word in self._words:
+            offsets.append(pos)
+            pos += len(word) + 1
+        self._blob = '\n'.join(self._words)
+        self._offsets = offsets
+
+
+class FallbackLemmatizer:
+    """基于规则的回退词形还原引擎（无 spaCy 时使用）
+
+    不规则词形表只构建一次；后缀规则按词尾字符编译为一张分派表，每个单词只需一次查表。
+    外部例外词表（完整的不规则动词/复数表等）直接并入字典，不影响每个单词的处理速度。
+    """
+    # 常见不规则动词
+    IRREGULAR_FORMS = {
+        'was': 'be', 'were': 'be', 'been': 'be', 'being': 'be',
+        'had': 'have', 'has': 'have', 'having': 'have',
+        'did': 'do', 'does': 'do', 'done': 'do', 'doing': 'do',
+        'went': 'go', 'goes': 'go', 'gone': 'go', 'going': 'go',
+        'came': 'come', 'comes': 'come', 'coming': 'come',
+        'saw': 'see', 'sees': 'see', 'seen': 'see', 'seeing': 'see',
+        'got': 'get', 'gets': 'get', 'gotten': 'get', 'getting': 'get',
+        'took': 'take', 'takes': 'take', 'taken': 'take', 'taking': 'take',
+        'made': 'make', 'makes': 'make', 'making': 'make',
+        'said': 'say', 'says': 'say', 'saying': 'say',
+        'told': 'tell', 'tells': 'tell', 'telling': 'tell',
+        'knew': 'know', 'knows': 'know', 'known': 'know', 'knowing': 'know',
+        'thought': 'think', 'thinks': 'think', 'thinking': 'think',
+        'felt': 'feel', 'feels': 'feel', 'feeling': 'feel',
+        'found': 'find', 'finds': 'find', 'finding': 'find',
+        'gave': 'give', 'gives': 'give', 'given': 'give', 'giving': 'give',
+        'ran': 'run', 'runs': 'run', 'running': 'run',
+        'wrote': 'write', 'writes': 'write', 'written': 'write', 'writing': 'write',
+    }
+
+    def __init__(self, exceptions=None):
+        self.exceptions = dict(self.IRREGULAR_FORMS)
+        if exceptions:
+            self.exceptions.update(exceptions)
+        # 后缀规则：(后缀, 单词需超过的长度, 处理函数)
+        self._dispatch = self._compile_rules((
+            ('ing', 5, self._strip_ing),
+            ('ed', 4, self._strip_ed),
+            ('s', 3, self._strip_s),
+        ))
+
+    @staticmethod
+    def _compile_rules(rules):
+        """按后缀最后一个字符分组，组内长后缀优先"""
+        table = {}
+        for suffix, min_length, handler in rules:
+            table.setdefault(suffix[-1], []).append((suffix, min_length, handler))
+        return {char: tuple(sorted(group, key=lambda rule: -len(rule[0])))
+                for char, group in table.items()}
+
+    def load_exceptions(self, filepath):
+        """加载外部例外词表，每行“词形 原形”，# 开头为注释，返回加载条数"""
+        count = 0
+        try:
+            with open(filepath, 'r', encoding='utf-8') as file:
+                for line in file:
+                    parts = line.split()
+                    if len(parts) >= 2 and not parts[0].startswith('#'):
+                        self.exceptions[parts[0].lower()] = parts[1].lower()
+                        count += 1
+        except Exception as e:
+            print(f"加载例外词表出错: {e}")
+        return count
+
+    def lemmatize(self, word):
+        """还原单个小写单词"""
+        lemma = self.exceptions.get(word)
+        if lemma is not None:
+            return lemma
+        if word:
+            for suffix, min_length, handler in self._dispatch.get(word[-1], ()):
+                if len(word) > min_length and word.endswith(suffix):
+                    return handler(word)
+        return word
+
+    def lemmatize_many(self, words):
+        """批量还原，重复单词只计算一次，返回与输入等长的列表"""
+        results = {}
+        lemmatize = self.lemmatize
+        output = []
+        for word in words:
+            lemma = results.get(word)
+            if lemma is None:
+                lemma = results[word] = lemmatize(word)
+            output.append(lemma)
+        return output
+
+    @staticmethod
+    def _strip_ing(word):
+        # running -> run (双写辅音)
+        if len(word) > 6 and word[-4] == word[-5] and word[-4] not in 'aeiou':
+            return word[:-4]
+        # making -> make
+        base = word[:-3]
+        # 尝试加e
+        if base[-1] not in 'aeiou' and base[-2] in 'aeiou':
+            return base + 'e'
+        return base
+
+    @staticmethod
+    def _strip_ed(word):
+        # succeeded -> succeed (eed结尾)
+        if word.endswith('eed') and len(word) > 5:
+            return word[:-2]  # 去掉 'ed' 而不是 'd'
+        # stopped -> stop (双写辅音)
+        if len(word) > 5 and word[-3] == word[-4] and word[-3] not in 'aeiou':
+            return word[:-3]
+        # fired -> fire, loved -> love
+        base = word[:-2]
+        if base[-1] not in 'aeiou' and base[-2] in 'aeiou':
+            return base + 'e'
+        return base
+
+    @staticmethod
+    def _strip_s(word):
+        # class -> class
+        if word.endswith('ss'):
+            return word
+        # cities -> city
+        if word.endswith('ies') and len(word) > 4:
+            return word[:-3] + 'y'
+        # boxes -> box, classes -> class
+        if word.endswith('es'):
+            base = word[:-2]
+            if base.endswith(('s', 'sh', 'ch', 'x', 'z')):
+                return base
+            return word[:-1]
+        # cats -> cat
+        return word[:-1]
+
+
+# 模块级的回退词形还原引擎，所有词库共用
+fallback_lemmatizer = FallbackLemmatizer()
+
+
+class BloomFilter:
+    """布隆过滤器：以很小的内存判断单词“一定不在”或“可能在”集合中"""
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(1, capacity)
+        self.bit_count = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.bit_count / capacity * math.log(2)))
+        self.bits = bytearray((self.bit_count + 7) // 8)
+
+    @classmethod
+    def from_words(cls, words, capacity, error_rate=0.01):
+        bloom = cls(capacity, error_rate)
+        for word in words:
+            bloom.add(word)
+        return bloom
+
+    def _positions(self, word):
+        # 双重哈希：由一个 128 位摘要派生出 hash_count 个位置
+        digest = hashlib.blake2b(word.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        bit_count = self.bit_count
+        return [(h1 + i * h2) % bit_count for i in range(self.hash_count)]
+
+    def copy(self):
+        """复制一份独立的过滤器，之后对原过滤器的修改不影响副本"""
+        bloom = BloomFilter.__new__(BloomFilter)
+        bloom.bit_count = self.bit_count
+        bloom.hash_count = self.hash_count
+        bloom.bits = bytearray(self.bits)
+        return bloom
+
+    def add(self, word):
+        bits = self.bits
+        for position in self._positions(word):
+            bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, word):
+        bits = self.bits
+        for position in self._positions(word):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+class BloomFilteredWords:
+    """大词库的高亮快照：布隆过滤器先排除绝大多数不在词库的单词，只有可能命中的才查询数据库
+
+    快照持有布隆过滤器的副本和一个独立的只读连接，连接上保持着创建快照时开始的读事务（WAL 模式），
+    所以一次高亮期间界面增删单词不影响结果，确认查询也不占用词库存储的锁。
+    """
+    def __init__(self, bloom, conn, list_name):
+        self.bloom = bloom
+        self.list_name = list_name
+        self._conn = conn
+        self._lock = threading.Lock()
+
+    def __contains__(self, word):
+        if word not in self.bloom:
+            return False
+        with self._lock:
+            return self._conn.execute(
+                'SELECT 1 FROM words WHERE list = ? AND word = ?', (self.list_name, word)
+            ).fetchone() is not None
+
+
+class MemoryWordStore:
+    """内存词库存储（默认）：集合负责成员判断，有序索引负责定位和搜索
+
+    以 BinaryWordList 创建时直接用它（二分查找）判断成员、定位和迭代，首次修改时才展开为集合和列表。
+    """
+    tracks_hits = False
+    stores_lemmas = False
+
+    def __init__(self, words=(), presorted=False):
+        self._lock = threading.Lock()
+        self.replace(words, presorted)
+
+    def replace(self, words, presorted=False):
+        """整体替换词库内容"""
+        index = SortedWordIndex(words, presorted)
+        with self._lock:
+            self.index = index
+            self._words = words if isinstance(words, BinaryWordList) else set(index)
+            self._frozen = None
+
+    def _writable(self):
+        """返回可修改的成员集合，二进制词库在此时才展开"""
+        if not isinstance(self._words, set):
+            self._words = set(self._words)
+        return self._words
+
+    def snapshot(self):
+        """返回当前词库的不可变快照，词库未修改时重复使用同一个 frozenset
+
+        二进制词库逐个查找需要二分和解码，高亮时逐词查询仍使用首次需要时生成的 frozenset。
+        """
+        with self._lock:
+            if self._frozen is None:
+                self._frozen = frozenset(self._words)
+            return self._frozen
+
+    def __contains__(self, word):
+        return word in self._words
+
+    def __len__(self):
+        return len(self._words)
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def add(self, word, lemma=None):
+        """添加单词，已存在返回 False"""
+        with self._lock:
+            if word in self._words:
+                return False
+            self._writable().add(word)
+            self.index.add(word)
+            self._frozen = None
+            return True
+
+    def discard(self, word):
+        """删除单词，不存在返回 False"""
+        with self._lock:
+            if word not in self._words:
+                return False
+            self._writable().remove(word)
+            self.index.discard(word)
+            self._frozen = None
+            return True
+
+    def locate(self, word):
+        return self.index.index(word)
+
+    def search(self, keyword, start=0, limit=None):
+        return self.index.search(keyword, start, limit)
+
+    def search_words(self, keyword, start=0, limit=None):
+        index = self.index
+        return [index[i] for i in index.search(keyword, start, limit)]
+
+    def page(self, start='', limit=None, inclusive=True):
+        return self.index.page(start, limit, inclusive)
+
+    def prefix_search(self, prefix, start=0, limit=None):
+        return self.index.prefix_search(prefix, start, limit)
+
+    def sorted_words(self):
+        return list(self.index)
+
+    def record_hits(self, counts):
+        """内存存储不统计命中次数"""
+
+    def close(self):
+        pass
+
+
+class SQLiteWordStore:
+    """SQLite 词库存储：单词、词形、添加时间和命中次数保存在带索引的表中
+
+    启动时不把词库读入内存；成员判断走主键索引并带一个小的 LRU 缓存，
+    前缀搜索走索引区间查询，批量写入在单个事务中完成。一个数据库可保存多个词表（list_name）。
+    """
+    EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+    MEMBERSHIP_CACHE_SIZE = 4096
+    # 单词数不少于此值时，高亮快照使用布隆过滤器而不是把整个词表读入内存
+    BLOOM_MIN_WORDS = 50000
+    BLOOM_ERROR_RATE = 0.01
+    PAGE_SIZE = 1000
+    tracks_hits = True
+    stores_lemmas = True
+
+    def __init__(self, path, list_name='default'):
+        self.path = path
+        self.list_name = list_name
+        self._lock = threading.RLock()
+        # sqlite3 在打开数据库词库时才导入，Android 上需要 python-for-android 的 sqlite3 recipe
+        import sqlite3
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        with self._conn:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS words ('
+                ' list TEXT NOT NULL,'
+                ' word TEXT NOT NULL,'
+                ' lemma TEXT,'
+                ' added_at REAL NOT NULL,'
+                ' hits INTEGER NOT NULL DEFAULT 0,'
+                ' PRIMARY KEY (list, word)'
+                ') WITHOUT ROWID'
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS words_lemma ON words (list, lemma)')
+        self._membership = OrderedDict()
+        self._count = None
+        self._snapshot = None
+        # 大词表的布隆过滤器，只要求是词表的超集：加词时直接加入，删词时沿用
+        self._bloom = None
+
+    @classmethod
+    def is_database_path(cls, filepath):
+        """根据扩展名判断是否为 SQLite 词库"""
+        return filepath.lower().endswith(cls.EXTENSIONS)
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _remember(self, word, present):
+        cache = self._membership
+        cache[word] = present
+        cache.move_to_end(word)
+        if len(cache) > self.MEMBERSHIP_CACHE_SIZE:
+            cache.popitem(last=False)
+
+    def __contains__(self, word):
+        with self._lock:
+            present = self._membership.get(word)
+            if present is None:
+                present = bool(self._conn.execute(
+                    'SELECT 1 FROM words WHERE list = ? AND word = ?', (self.list_name, word)
+                ).fetchone())
+                self._remember(word, present)
+            return present
+
+    def __len__(self):
+        with self._lock:
+            if self._count is None:
+                self._count = self._conn.execute(
+                    'SELECT COUNT(*) FROM words WHERE list = ?', (self.list_name,)
+                ).fetchone()[0]
+            return self._count
+
+    def __iter__(self):
+        """按字母顺序分页读取，不一次性载入全部单词"""
+        last = ''
+        while True:
+            rows = self._execute(
+                'SELECT word FROM words WHERE list = ? AND word > ? ORDER BY word LIMIT ?',
+                (self.list_name, last, self.PAGE_SIZE)
+            )
+            for (word,) in rows:
+                yield word
+            if len(rows) < self.PAGE_SIZE:
+                return
+            last = rows[-1][0]
+
+    def add(self, word, lemma=None):
+        """添加单词，已存在返回 False"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                'INSERT OR IGNORE INTO words (list, word, lemma, added_at) VALUES (?, ?, ?, ?)',
+                (self.list_name, word, lemma or word, time.time())
+            )
+            added = cursor.rowcount == 1
+            self._remember(word, True)
+            if added:
+                if self._count is not None:
+                    self._count += 1
+                self._invalidate_snapshot(word)
+            return added
+
+    def discard(self, word):
+        """删除单词，不存在返回 False"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                'DELETE FROM words WHERE list = ? AND word = ?', (self.list_name, word)
+            )
+            removed = cursor.rowcount == 1
+            self._remember(word, False)
+            if removed:
+                if self._count is not None:
+                    self._count -= 1
+                self._invalidate_snapshot()
+            return removed
+
+    def update(self, words, lemmas=None):
+        """在一个事务中批量插入单词"""
+        now = time.time()
+        lemmas = lemmas or {}
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO words (list, word, lemma, added_at) VALUES (?, ?, ?, ?)',
+                ((self.list_name, word, lemmas.get(word, word), now) for word in words)
+            )
+            self._membership.clear()
+            self._count = None
+            self._snapshot = None
+            self._bloom = None
+
+    def replace(self, words, presorted=False, lemmatize=None):
+        """在一个事务中整体替换当前词表，lemmatize(words) 逐个产出 (单词, 词形)，为空时词形即单词"""
+        now = time.time()
+        rows = lemmatize(words) if lemmatize else ((word, word) for word in words)
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM words WHERE list = ?', (self.list_name,))
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO words (list, word, lemma, added_at) VALUES (?, ?, ?, ?)',
+                ((self.list_name, word, lemma, now) for word, lemma in rows)
+            )
+            self._membership.clear()
+            self._count = None
+            self._snapshot = None
+            self._bloom = None
+
+    def _invalidate_snapshot(self, added=None):
+        """词表变化后丢弃快照；已交出的快照不受影响，布隆过滤器加入新词后沿用，无需重建"""
+        if added is not None and self._bloom is not None:
+            self._bloom.add(added)
+        self._snapshot = None
+
+    def _open_reader(self):
+        """打开独立的只读连接并开始读事务，固定此刻的词表内容"""
+        import sqlite3
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute('BEGIN')
+        # 读事务在第一次查询时才真正开始
+        conn.execute('SELECT 1 FROM words LIMIT 1').fetchone()
+        return conn
+
+    def snapshot(self):
+        """返回用于一次高亮的词表快照：小词表读入 frozenset，大词表使用布隆过滤器加只读事务确认"""
+        with self._lock:
+            if self._snapshot is None:
+                count = len(self)
+                if count >= self.BLOOM_MIN_WORDS:
+                    reader = self._open_reader()
+                    if self._bloom is None:
+                        rows = reader.execute('SELECT word FROM words WHERE list = ?', (self.list_name,))
+                        self._bloom = BloomFilter.from_words(
+                            (word for (word,) in rows), count, self.BLOOM_ERROR_RATE)
+                    self._snapshot = BloomFilteredWords(self._bloom.copy(), reader, self.list_name)
+                else:
+                    self._snapshot = frozenset(self)
+            return self._snapshot
+
+    def locate(self, word):
+        """返回单词在有序词表中的位置，不存在返回 -1（主键索引上的区间计数）"""
+        if word not in self:
+            return -1
+        return self._execute(
+            'SELECT COUNT(*) FROM words WHERE list = ? AND word < ?', (self.list_name, word)
+        )[0][0]
+
+    def search(self, keyword, start=0, limit=None):
+        """子串搜索，返回分页后的匹配位置列表（在数据库中按顺序扫描，不把词表读入内存）"""
+        rows = self._execute(
+            'SELECT position FROM ('
+            ' SELECT word, ROW_NUMBER() OVER (ORDER BY word) - 1 AS position FROM words WHERE list = ?'
+            ') WHERE instr(word, ?) > 0 ORDER BY position LIMIT ? OFFSET ?',
+            (self.list_name, keyword, -1 if limit is None else limit, start)
+        )
+        return [position for (position,) in rows]
+
+    def search_words(self, keyword, start=0, limit=None):
+        """子串搜索，返回分页后的匹配单词列表"""
+        rows = self._execute(
+            'SELECT word FROM words WHERE list = ? AND instr(word, ?) > 0 ORDER BY word LIMIT ? OFFSET ?',
+            (self.list_name, keyword, -1 if limit is None else limit, start)
+        )
+        return [word for (word,) in rows]
+
+    def page(self, start='', limit=None, inclusive=True):
+        """返回从 start 开始（inclusive=False 时不含 start）的最多 limit 个单词，走主键索引"""
+        rows = self._execute(
+            'SELECT word FROM words WHERE list = ? AND word %s ? ORDER BY word LIMIT ?' % ('>=' if inclusive else '>'),
+            (self.list_name, start, -1 if limit is None else limit)
+        )
+        return [word for (word,) in rows]
+
+    def prefix_search(self, prefix, start=0, limit=None):
+        """前缀搜索，使用主键索引的区间查询"""
+        if prefix:
+            upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        else:
+            upper = chr(0x10FFFF)
+        rows = self._execute(
+            'SELECT word FROM words WHERE list = ? AND word >= ? AND word < ? ORDER BY word LIMIT ? OFFSET ?',
+            (self.list_name, prefix, upper, -1 if limit is None else limit, start)
+        )
+        return [word for (word,) in rows]
+
+    def sorted_words(self):
+        return list(self)
+
+    def record_hits(self, counts):
+        """累加高亮命中次数"""
+        if not counts:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'UPDATE words SET hits = hits + ? WHERE list = ? AND word = ?',
+                ((count, self.list_name, word) for word, count in counts.items())
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class LemmaCache:
+    """词形还原结果缓存（按最近使用淘汰）"""
+    def __init__(self, max_size=50000):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, word):
+        """查询缓存，未命中返回 None"""
+        with self._lock:
+            lemma = self._data.get(word)
+            if lemma is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(word)
+            self.hits += 1
+            return lemma
+
+    def put(self, word, lemma):
+        """写入缓存，超出容量时淘汰最久未使用的条目"""
+        with self._lock:
+            self._data[word] = lemma
+            self._data.move_to_end(word)
+            if len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def put_many(self, items):
+        """批量写入缓存，整批只加一次锁"""
+        with self._lock:
+            for word, lemma in items.items():
+                self._data[word] = lemma
+                self._data.move_to_end(word)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        """清空缓存和命中统计"""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """返回命中统计"""
+        total = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+    def save(self, filepath, tag):
+        """保存缓存到文件，tag 标识生成缓存的词形还原器"""
+        try:
+            with self._lock:
+                items = list(self._data.items())
+            with open(filepath, 'w', encoding='utf-8') as file:
+                file.write(tag + '\n')
+                file.writelines(f'{word}\t{lemma}\n' for word, lemma in items)
+            return True
+        except Exception as e:
+            print(f"保存词形缓存出错: {e}")
+            return False
+
+    def load(self, filepath, tag):
+        """从文件加载缓存，tag 不一致时忽略（词形还原器已变化）"""
+        if not os.path.exists(filepath):
+            return False
+        try:
+            with open(filepath, 'r', encoding='utf-8') as file:
+                if file.readline().rstrip('\n') != tag:
+                    return False
+                for line in file:
+                    word, sep, lemma = line.rstrip('\n').partition('\t')
+                    if sep and lemma:
+                        self.put(word, lemma)
+            return True
+        except Exception as e:
+            print(f"加载词形缓存出错: {e}")
+            return False
+
+
+class WordBank:
+    """词库管理类"""
+    # 批量高亮时 spaCy 每批处理的段落数
+    PIPE_BATCH_SIZE = 64
+    # 词形还原用不到的 spaCy 组件，批量处理时禁用
+    PIPE_DISABLED = ('parser', 'ner')
+    # 附加词库依次使用的高亮颜色（主词库为橙色 ff6b00）
+    BANK_COLORS = ('1e88e5', '43a047', '8e24aa', 'd81b60', '00897b', '6d4c41')
+
+    def __init__(self, show_error_callback=None, lemma_cache_path=None, on_model_ready=None, storage=None):
+        """初始化词库，spaCy 模型在后台线程加载，加载完成前使用简化的词形还原"""
+        self.show_error_callback = show_error_callback
+        self.on_model_ready = on_model_ready
+        self.lemma_cache = LemmaCache()
+        self.lemma_cache_path = lemma_cache_path
+        self.nlp = None
+        # 模型状态：loading（后台加载中）、ready（已就绪）、fallback（简化模式）
+        self.model_state = 'fallback'
+        self.model_ready = threading.Event()
+        self.model_load_seconds = None
+        self.set_nlp(None)
+        # 词库存储后端：默认在内存中，也可使用 SQLiteWordStore
+        self.words = storage if storage is not None else MemoryWordStore()
+        # 附加词库（只读，如 CET-4、CET-6）：名称 -> 单词集合，第 i 个词库对应位掩码第 i 位
+        self.named_banks = OrderedDict()
+        self.bank_colors = ()
+        self.bank_masks = {}  # 词形 -> 所属附加词库的位掩码
+        self.journal = None  # 词库文件的变更日志，加载或保存词库文件后启用
+        self.track_hits = True  # 存储后端支持时统计命中次数（批处理等只读场景应关闭）
+        self.model_path = None
+        self.exceptions_path = None
+        
+        model_path = None
+        try:
+            # 获取应用数据路径
+            if platform == 'android':
+                from android.storage import app_storage_path
+                base_path = app_storage_path()
+            elif getattr(sys, 'frozen', False):
+                base_path = sys._MEIPASS
+            else:
+                base_path = os.path.dirname(os.path.abspath(__file__))
+            
+            model_path = os.path.join(base_path, "en_core_web_sm")
+            
+            # 可选的外部例外词表，用于扩充回退词形还原
+            exceptions_path = os.path.join(base_path, "lemma_exceptions.txt")
+            if os.path.exists(exceptions_path):
+                count = fallback_lemmatizer.load_exceptions(exceptions_path)
+                self.exceptions_path = exceptions_path
+                print(f"已加载例外词表: {exceptions_path}（{count} 条）")
+        except Exception as e:
+            print(f"加载模型出错: {e}")
+            if self.show_error_callback:
+                self.show_error_callback("错误", f"加载模型出错: {e}\n将使用简化模式")
+        
+        if model_path is None:
+            self.model_ready.set()
+        elif not os.path.exists(model_path):
+            # 如果模型不存在，使用简化的词形还原
+            print(f"警告: 模型文件夹不存在: {model_path}，使用简化模式")
+            self.model_ready.set()
+            if self.show_error_callback:
+                self.show_error_callback("提示", "未找到 spaCy 模型，将使用简化的词形还原功能")
+        else:
+            self.model_state = 'loading'
+            self.model_path = model_path
+            threading.Thread(target=self._load_model, args=(model_path,), daemon=True).start()
+
+    def _load_model(self, model_path):
+        """后台加载 spaCy 模型（连同 spacy 模块本身）"""
+        start = time.perf_counter()
+        try:
+            import spacy
+            nlp = spacy.load(model_path)
+        except Exception as e:
+            print(f"加载模型出错: {e}")
+            self.model_state = 'fallback'
+            self.model_ready.set()
+            if self.show_error_callback:
+                self.show_error_callback("错误", f"加载模型出错: {e}\n将使用简化模式")
+            return
+        self.model_load_seconds = time.perf_counter() - start
+        print(f"[调试] spaCy 模型加载耗时: {self.model_load_seconds:.2f} 秒")
+        self.set_nlp(nlp)
+        self.model_state = 'ready'
+        self.model_ready.set()
+        if self.on_model_ready:
+            self.on_model_ready()
+
+    def wait_for_model(self, timeout=None):
+        """等待模型加载结束，返回模型是否可用"""
+        self.model_ready.wait(timeout)
+        return self.nlp is not None
+
+    def set_nlp(self, nlp):
+        """切换词形还原模型，并重置对应的词形缓存"""
+        self.nlp = nlp
+        self.lemma_cache.clear()
+        if self.lemma_cache_path:
+            self.lemma_cache.load(self.lemma_cache_path, self._lemma_cache_tag())
+
+    def _lemma_cache_tag(self):
+        """标识当前词形还原器，避免加载其他模型生成的缓存"""
+        if self.nlp:
+            meta = getattr(self.nlp, 'meta', {}) or {}
+            return f"spacy:{meta.get('name', '')}:{meta.get('version', '')}"
+        return 'fallback'
+
+    def save_lemma_cache(self):
+        """持久化词形缓存，下次启动时直接命中"""
+        if not self.lemma_cache_path:
+            return False
+        return self.lemma_cache.save(self.lemma_cache_path, self._lemma_cache_tag())
+
+    def add_word(self, word):
+        """添加单词到词库"""
+        word = word.lower().strip()
+        if not word:
+            return None
+        # 只有保存词形的存储后端才需要词形还原（spaCy 模式下每次调用都要跑一次模型）
+        lemma = self.normalize_word(word) if self.words.stores_lemmas else None
+        if self.words.add(word, lemma) and self.journal:
+            self.journal.record('+', word)
+        return word
+
+    def remove_word(self, word):
+        """从词库移除单词"""
+        word = word.lower().strip()
+        if self.words.discard(word):
+            if self.journal:
+                self.journal.record('-', word)
+            return True
+        return False
+
+    def load_named_bank(self, name, filepath, color=None):
+        """加载（或替换）一个附加词库，与主词库同时生效并以单独的颜色高亮"""
+        try:
+            if SQLiteWordStore.is_database_path(filepath):
+                store = SQLiteWordStore(filepath)
+                try:
+                    words = frozenset(store)
+                finally:
+                    store.close()
+            else:
+                words = frozenset(self._read_word_file(filepath)[0])
+            colors = dict(zip(self.named_banks, self.bank_colors))
+            self.named_banks[name] = words
+            colors[name] = color or colors.get(name) or \
+                self.BANK_COLORS[(len(self.named_banks) - 1) % len(self.BANK_COLORS)]
+            self._rebuild_bank_masks(colors)
+            print(f"[调试] 已加载附加词库 {name}: {len(words)} 个单词")
+            return True
+        except Exception as e:
+            print(f"加载附加词库出错: {e}")
+            return False
+
+    def unload_named_bank(self, name=None):
+        """卸载指定的附加词库，name 为 None 时卸载全部"""
+        colors = dict(zip(self.named_banks, self.bank_colors))
+        if name is None:
+            self.named_banks.clear()
+        elif self.named_banks.pop(name, None) is None:
+            return False
+        self._rebuild_bank_masks(colors)
+        return True
+
+    def _rebuild_bank_masks(self, colors):
+        """重新计算词形 -> 位掩码索引，高亮时每个词形只需一次字典查找"""
+        masks = {}
+        get = masks.get
+        for bit, words in enumerate(self.named_banks.values()):
+            flag = 1 << bit
+            for word in words:
+                masks[word] = get(word, 0) | flag
+        # 整体替换引用，后台高亮线程不会看到构建到一半的索引
+        self.bank_masks = masks
+        self.bank_colors = tuple(colors[name] for name in self.named_banks)
+
+    def bank_names(self, lemma):
+        """返回包含该词形的附加词库名称"""
+        banks = self.bank_masks.get(lemma, 0)
+        return [name for bit, name in enumerate(self.named_banks) if banks >> bit & 1]
+
+    def use_storage(self, storage):
+        """切换词库存储后端"""
+        if storage is not self.words:
+            self.words.close()
+            self.words = storage
+
+    def locate(self, word):
+        """返回单词在有序词库中的位置，不存在返回 -1"""
+        return self.words.locate(word.lower().strip())
+
+    def search(self, keyword, start=0, limit=None):
+        """子串搜索词库，返回分页后的匹配位置列表"""
+        return self.words.search(keyword.lower(), start, limit)
+
+    def search_words(self, keyword, start=0, limit=None):
+        """词库列表的搜索，返回分页后的匹配单词列表
+
+        有以 keyword 开头的单词时按前缀查找（有序索引或数据库索引上的区间），否则退回子串搜索。
+        """
+        keyword = keyword.lower()
+        if self.words.prefix_search(keyword, 0, 1):
+            return self.words.prefix_search(keyword, start, limit)
+        return self.words.search_words(keyword, start, limit)
+
+    def page(self, start='', limit=None, inclusive=True):
+        """按字母顺序分页读取词库，返回从 start 开始的最多 limit 个单词"""
+        return self.words.page(start, limit, inclusive)
+
+    def prefix_search(self, prefix, start=0, limit=None):
+        """前缀搜索词库，返回分页后的单词列表"""
+        return self.words.prefix_search(prefix.lower(), start, limit)
+
+    def sorted_words(self):
+        """返回按字母排序的单词列表"""
+        return self.words.sorted_words()
+
+    def lemmatize_words(self, words):
+        """逐个产出 (单词, 词形)，spaCy 模式下批量处理"""
+        nlp = self.nlp
+        if not nlp:
+            for word in words:
+                yield word, self.normalize_word(word)
+            return
+        disabled = [name for name in self.PIPE_DISABLED if name in nlp.pipe_names]
+        for doc in nlp.pipe(words, batch_size=1000, disable=disabled):
+            yield doc.text, doc[0].lemma_.lower() if doc else doc.text
+
+    def normalize_word(self, word):
+        """词形还原"""
+        word = word.lower()
+        nlp = self.nlp
+        if nlp:
+            lemma = self.lemma_cache.get(word)
+            if lemma is None:
+                doc = nlp(word)
+                lemma = doc[0].lemma_.lower() if doc else word
+                self.lemma_cache.put(word, lemma)
+            return lemma
+        else:
+            # 改进的词形还原（回退模式）
+            return self._fallback_lemmatize(word)
+    
+    def _fallback_lemmatize(self, word):
+        """改进的回退词形还原（无spaCy时使用）"""
+        # 规则还原本身比加锁查询缓存还快，直接计算，不经过词形缓存
+        return fallback_lemmatizer.lemmatize(word)
+
+    def bank_snapshot(self):
+        """返回本次高亮使用的词库快照，高亮期间界面修改词库不影响这次结果"""
+        return self.words.snapshot()
+
+    def _segments_from_doc(self, doc, words, masks):
+        """把 spaCy 处理结果转换为高亮分段列表"""
+        text = doc.text
+        result = []
+        learned = {}
+        last_end = 0
+        for token in doc:
+            if token.is_alpha:
+                start, end = token.idx, token.idx + len(token.text)
+                if start > last_end:
+                    gap = text[last_end:start]
+                    result.append(Segment(gap, "normal", None, _gap_kind(gap)))
+                lemma = token.lemma_.lower()
+                learned[token.lower_] = lemma
+                tag = "highlight" if lemma in words else "normal"
+                result.append(Segment(token.text, tag, lemma, "word", masks.get(lemma, 0)))
+                last_end = end
+        if last_end < len(text):
+            gap = text[last_end:]
+            result.append(Segment(gap, "normal", None, _gap_kind(gap)))
+        # 上下文中得到的词形按段一次性写入缓存，供 normalize_word 复用
+        if learned:
+            self.lemma_cache.put_many(learned)
+        return result
+
+    def highlight_paragraphs(self, paragraphs, batch_size=None):
+        """批量高亮多个段落，按输入顺序逐段产出分段列表"""
+        batch_size = batch_size or self.PIPE_BATCH_SIZE
+        # 模型可能在后台加载完成，整个批次固定使用开始时的词形还原器
+        nlp = self.nlp
+        # 同样固定词库快照和附加词库索引，整个批次的结果前后一致
+        words = self.bank_snapshot()
+        masks = self.bank_masks
+        if nlp:
+            # 通过 nlp.pipe 流式批处理，并禁用词形还原用不到的组件
+            disabled = [name for name in self.PIPE_DISABLED if name in nlp.pipe_names]
+            results = (self._segments_from_doc(doc, words, masks)
+                       for doc in nlp.pipe(paragraphs, batch_size=batch_size, disable=disabled))
+        else:
+            results = (self.highlight_words(paragraph, words, masks) for paragraph in paragraphs)
+        return self.count_hits(results)
+
+    def count_hits(self, results):
+        """逐段转发高亮结果，存储后端需要时统计本次高亮中各词库单词的命中次数"""
+        store = self.words
+        hits = Counter() if self.track_hits and store.tracks_hits else None
+        try:
+            for segments in results:
+                if hits is not None:
+                    hits.update(segment.lemma for segment in segments if segment.tag == "highlight")
+                yield segments
+        finally:
+            if hits:
+                store.record_hits(hits)
+
+    def highlight_words(self, text, words=None, masks=None):
+        """高亮文本中的词库单词，words/masks 为空时使用当前词库快照和附加词库索引"""
+        if words is None:
+            words = self.bank_snapshot()
+        if masks is None:
+            masks = self.bank_masks
+        nlp = self.nlp
+        if nlp:
+            return self._segments_from_doc(nlp(text), words, masks)
+        else:
+            # 简化模式：单次正则扫描分词，数字等非字母片段与标点同样按不可点击文本处理
+            result = []
+            append = result.append
+            normalize_word = self.normalize_word
+            for start, end, kind in iter_token_spans(text):
+                if kind == "word":
+                    word = text[start:end]
+                    lemma = normalize_word(_strip_possessive(word))
+                    tag = "highlight" if lemma in words else "normal"
+                    append(Segment(word, tag, lemma, "word", masks.get(lemma, 0)))
+                else:
+                    append(Segment(text[start:end], "normal", None, kind))
+            return result
+
+    @staticmethod
+    def _write_snapshot(filepath, words):
+        """写入完整词库，扩展名为 .whb 时为二进制格式，否则每行一个单词"""
+        if filepath.lower().endswith(BinaryWordList.EXTENSION):
+            BinaryWordList.write(filepath, words)
+        else:
+            temp_path = filepath + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as file:
+                file.write('\n'.join(words))
+            os.replace(temp_path, filepath)
+
+    def save_word_bank(self, filepath, full=False):
+        """保存词库到文件
+
+        已对该文件启用变更日志时把日志刷到磁盘，并在后台线程把修改合并进词库文件（full=True 时立即重写整个文件），
+        否则写入完整快照并开始对该文件记录日志。
+        """
+        try:
+            if SQLiteWordStore.is_database_path(filepath):
+                # SQLite 词库每次修改都已提交，保存到其他数据库时整体写入并切换过去
+                if isinstance(self.words, SQLiteWordStore) and self.words.path == filepath:
+                    return True
+                store = SQLiteWordStore(filepath)
+                store.replace(self.words, lemmatize=self.lemmatize_words)
+                self.close_journal()
+                self.use_storage(store)
+                return True
+            journal = self.journal
+            if journal and journal.bank_path == filepath and not full:
+                # 日志只用于两次保存之间的崩溃恢复：显式保存时在后台把修改合并进词库文件
+                journal.sync()
+                journal.compact()
+                return True
+            # 存储后端按字母顺序迭代，无需每次保存都重新排序
+            self._write_snapshot(filepath, self.words)
+            if journal and journal.bank_path == filepath:
+                journal.reset()
+            else:
+                self.attach_journal(filepath, fresh=True)
+            return True
+        except Exception as e:
+            print(f"保存词库出错: {e}")
+            return False
+
+    def attach_journal(self, filepath, fresh=False):
+        """对词库文件启用变更日志，fresh=True 表示快照刚写入，丢弃旧日志"""
+        self.close_journal()
+        if fresh:
+            for suffix in (WordBankJournal.COMPACTING_SUFFIX, WordBankJournal.SUFFIX):
+                if os.path.exists(filepath + suffix):
+                    os.remove(filepath + suffix)
+        try:
+            self.journal = WordBankJournal(filepath, self.sorted_words, self._write_snapshot)
+        except Exception as e:
+            print(f"启用词库日志出错: {e}")
+            self.journal = None
+
+    def close_journal(self):
+        """关闭变更日志"""
+        if self.journal:
+            self.journal.close()
+            self.journal = None
+
+    @staticmethod
+    def _read_word_file(filepath):
+        """读取二进制或文本词库文件，返回 (单词序列, 是否已排序)
+
+        二进制词库以只读视图返回，不解码成列表；Windows 上映射中的文件无法被替换（保存时），改为一次读入。
+        """
+        if BinaryWordList.is_binary_file(filepath):
+            return BinaryWordList.load(filepath, use_mmap=platform != 'win'), True
+        with open(filepath, 'r', encoding='utf-8') as file:
+            return {line.strip().lower() for line in file if line.strip()}, False
+
+    def load_word_bank(self, filepath, journal=True):
+        """从文件加载词库，根据扩展名识别 SQLite 数据库，根据文件头识别二进制或文本格式
+
+        journal=False 时只读取（仍会重放已有的变更日志），之后的修改不记录到日志。
+        """
+        try:
+            if SQLiteWordStore.is_database_path(filepath):
+                # 直接使用数据库作为存储后端，不把词库读入内存
+                self.close_journal()
+                self.use_storage(SQLiteWordStore(filepath))
+                return True
+            words, presorted = self._read_word_file(filepath)
+            # 重放上次未合并的变更日志，之后的修改继续记录到该文件的日志
+            # （日志为空时不展开，二进制词库保持只读视图）
+            if WordBankJournal.has_entries(filepath):
+                words = set(words)
+                WordBankJournal.replay(filepath, words)
+                presorted = False
+            self.use_storage(MemoryWordStore(words, presorted))
+            if journal:
+                self.attach_journal(filepath)
+            else:
+                self.close_journal()
+            return True
+        except Exception as e:
+            print(f"加载词库出错: {e}")
+            return False
+
+
+# 多进程高亮的工作进程状态：每个进程初始化时加载一次模型
+_worker_nlp = None
+_worker_lemmas = None
+
+
+def _init_highlight_worker(model_path, exceptions_path):
+    """工作进程初始化：加载例外词表和 spaCy 模型（model_path 为 None 时使用简化模式）"""
+    global _worker_nlp, _worker_lemmas
+    _worker_lemmas = LemmaCache()
+    if exceptions_path:
+        fallback_lemmatizer.load_exceptions(exceptions_path)
+    if model_path:
+        try:
+            import spacy
+            _worker_nlp = spacy.load(model_path)
+        except Exception as e:
+            print(f"工作进程加载模型出错: {e}，使用简化模式")
+            _worker_nlp = None
+
+
+def _worker_word_spans(paragraphs):
+    """工作进程：逐段产出 [(起点, 长度, 词形), ...]"""
+    nlp = _worker_nlp
+    if nlp:
+        disabled = [name for name in WordBank.PIPE_DISABLED if name in nlp.pipe_names]
+        for doc in nlp.pipe(paragraphs, batch_size=WordBank.PIPE_BATCH_SIZE, disable=disabled):
+            yield [(token.idx, len(token.text), token.lemma_.lower()) for token in doc if token.is_alpha]
+    else:
+        cache = _worker_lemmas
+        for text in paragraphs:
+            spans = []
+            for start, end, kind in iter_token_spans(text):
+                if kind == "word":
+                    word = _strip_possessive(text[start:end]).lower()
+                    lemma = cache.get(word)
+                    if lemma is None:
+                        lemma = fallback_lemmatizer.lemmatize(word)
+                        cache.put(word, lemma)
+                    spans.append((start, end - start, lemma))
+            yield spans
+
+
+def _highlight_batch(paragraphs):
+    """工作进程：对一批段落分词并还原词形，返回紧凑数组而不是分段元组
+
+    返回 (是否简化模式, 词形表, 每段单词数, 起点, 长度, 词形编号)，后四项为 array，
+    词形编号指向本批次的词形表。简化模式下单词之间的片段需按空白和标点再拆分。
+    """
+    lemmas = []
+    lemma_ids = {}
+    counts = array('I')
+    offsets = array('I')
+    lengths = array('I')
+    ids = array('I')
+    for spans in _worker_word_spans(paragraphs):
+        counts.append(len(spans))
+        for start, length, lemma in spans:
+            lemma_id = lemma_ids.get(lemma)
+            if lemma_id is None:
+                lemma_id = lemma_ids[lemma] = len(lemmas)
+                lemmas.append(lemma)
+            offsets.append(start)
+            lengths.append(length)
+            ids.append(lemma_id)
+    return _worker_nlp is None, lemmas, counts, offsets, lengths, ids
+
+
+class ParallelHighlighter:
+    """多进程高亮引擎（桌面/服务器）：段落按批次分发到进程池，结果按输入顺序合并
+
+    工作进程只做分词和词形还原，返回紧凑数组；是否在词库由主进程按本批次的词形表
+    对词库快照逐个词形判断，因此进程池可以在多次高亮之间复用，词库修改无需重建进程。
+    """
+    BATCH_PARAGRAPHS = 256
+
+    def __init__(self, word_bank, processes=None, batch_size=BATCH_PARAGRAPHS):
+        self.word_bank = word_bank
+        self.processes = processes or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self._executor = None
+        self._model_path = None
+
+    @staticmethod
+    def available(require_fork=False):
+        """是否支持多进程高亮（Android/iOS 上不可用）
+
+        从 Kivy 界面进程调用时应传入 require_fork=True：以 spawn 方式启动的工作进程会重新执行主模块（导入界面），
+        而 fork 已初始化 Cocoa/OpenGL 的进程在 macOS 上不安全，所以界面中只在 Linux 上启用。
+        """
+        if platform in ('android', 'ios'):
+            return False
+        return not require_fork or (platform == 'linux' and 'fork' in multiprocessing.get_all_start_methods())
+
+    @staticmethod
+    def _context():
+        # Linux 上优先使用 fork，工作进程直接继承父进程已导入的模块；其他平台使用默认方式（macOS 为 spawn）
+        if platform == 'linux' and 'fork' in multiprocessing.get_all_start_methods():
+            return multiprocessing.get_context('fork')
+        return multiprocessing.get_context()
+
+    def _pool(self):
+        # 主进程使用模型时工作进程也加载同一模型，否则使用简化模式
+        model_path = self.word_bank.model_path if self.word_bank.nlp is not None else None
+        if self._executor is None or model_path != self._model_path:
+            self.close()
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=self._context(),
+                initializer=_init_highlight_worker,
+                initargs=(model_path, self.word_bank.exceptions_path)
+            )
+            self._model_path = model_path
+        return self._executor
+
+    @staticmethod
+    def _batches(paragraphs, size):
+        batch = []
+        for paragraph in paragraphs:
+            batch.append(paragraph)
+            if len(batch) >= size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def highlight_paragraphs(self, paragraphs, batch_size=None):
+        """与 WordBank.highlight_paragraphs 相同：按输入顺序逐段产出分段列表"""
+        return self.word_bank.count_hits(self._highlight(paragraphs, batch_size or self.batch_size))
+
+    def _highlight(self, paragraphs, batch_size):
+        executor = self._pool()
+        words = self.word_bank.bank_snapshot()
+        masks = self.word_bank.bank_masks
+        # 同时在途的批次数有上限，流式读取大文件时内存占用不随文件大小增长
+        pending = deque()
+        max_pending = self.processes * 2
+        try:
+            for batch in self._batches(paragraphs, batch_size):
+                pending.append((batch, executor.submit(_highlight_batch, batch)))
+                if len(pending) >= max_pending:
+                    batch, future = pending.popleft()
+                    yield from self._merge(batch, future.result(), words, masks)
+            while pending:
+                batch, future = pending.popleft()
+                yield from self._merge(batch, future.result(), words, masks)
+        finally:
+            # 调用方提前结束（如任务被取消）时丢弃尚未开始的批次
+            for _, future in pending:
+                future.cancel()
+
+    @staticmethod
+    def _merge(paragraphs, result, words, masks):
+        """把一个批次的紧凑数组还原为分段列表"""
+        fallback, lemmas, counts, offsets, lengths, ids = result
+        # 每个词形只判断一次是否在词库中
+        tags = ["highlight" if lemma in words else "normal" for lemma in lemmas]
+        banks = [masks.get(lemma, 0) for lemma in lemmas]
+        position = 0
+        for text, count in zip(paragraphs, counts):
+            result = []
+            append = result.append
+            last_end = 0
+            for k in range(position, position + count):
+                start = offsets[k]
+                if start > last_end:
+                    ParallelHighlighter._append_gap(append, text[last_end:start], fallback)
+                lemma_id = ids[k]
+                last_end = start + lengths[k]
+                append(Segment(text[start:last_end], tags[lemma_id], lemmas[lemma_id], "word", banks[lemma_id]))
+            if last_end < len(text):
+                ParallelHighlighter._append_gap(append, text[last_end:], fallback)
+            position += count
+            yield result
+
+    @staticmethod
+    def _append_gap(append, gap, fallback):
+        if fallback:
+            # 与简化模式的单次扫描结果一致：空白和标点分别成段
+            for start, end, kind in iter_token_spans(gap):
+                append(Segment(gap[start:end], "normal", None, kind))
+        else:
+            append(Segment(gap, "normal", None, _gap_kind(gap)))
+
+    def close(self):
+        """关闭进程池"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# 导入文本文件时依次尝试的编码
+TEXT_ENCODINGS = ('utf-8', 'gbk', 'gb2312', 'latin-1')
+# 段落分隔：中间只有空白的连续换行
+_PARAGRAPH_BREAK_RE = re.compile(r'\n\s*\n')
+# 界面中一个显示项（一个 Label 纹理）的最大字符数，超长段落拆成多项，避免纹理高度超过 GPU 上限
+RENDER_ITEM_CHARS = 3000
+
+
+def split_long_paragraph(text, max_chars=RENDER_ITEM_CHARS):
+    """把超长段落按行（一行过长时在空格处）切成不超过 max_chars 个字符的片段"""
+    while len(text) > max_chars:
+        cut = text.rfind('\n', 0, max_chars)
+        if cut > 0:
+            yield text[:cut]
+            text = text[cut + 1:]
+            continue
+        cut = text.rfind(' ', 0, max_chars)
+        if cut <= 0:
+            cut = max_chars
+        yield text[:cut]
+        text = text[cut:]
+    if text:
+        yield text
+
+
+def detect_encoding(filepath, sample_size=64 * 1024, encodings=TEXT_ENCODINGS):
+    """读取文件开头的一段样本检测编码，只读一次，检测失败返回 None"""
+    with open(filepath, 'rb') as file:
+        sample = file.read(sample_size)
+    return detect_sample_encoding(sample, encodings)
+
+
+def detect_sample_encoding(sample, encodings=TEXT_ENCODINGS):
+    """检测一段字节样本的编码，检测失败返回 None"""
+    for encoding in encodings:
+        try:
+            # 增量解码，样本末尾被截断的多字节字符不算错误
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return None
+
+
+class TextFileSource:
+    """按块流式读取文本文件并逐段产出，整个文件不会作为一个字符串驻留内存"""
+    CHUNK_SIZE = 1024 * 1024
+    # 没有空行的超长文本按该长度（尽量在换行或空格处）切分，避免缓冲区无限增长
+    MAX_PARAGRAPH_CHARS = 64 * 1024
+
+    def __init__(self, filepath, encoding=None, chunk_size=CHUNK_SIZE):
+        self.filepath = filepath
+        self.encoding = encoding or detect_encoding(filepath)
+        self.chunk_size = chunk_size
+        self.size = os.path.getsize(filepath)
+        self.bytes_read = 0
+
+    @property
+    def progress(self):
+        """已读取字节占文件大小的百分比"""
+        return self.bytes_read / self.size * 100 if self.size else 100.0
+
+    def _iter_text(self):
+        """按块产出解码后的文本，样本之后出现的非法字节替换为占位符"""
+        decoder = codecs.getincrementaldecoder(self.encoding)(errors='replace')
+        self.bytes_read = 0
+        with open(self.filepath, 'rb') as file:
+            while True:
+                chunk = file.read(self.chunk_size)
+                self.bytes_read += len(chunk)
+                if not chunk:
+                    tail = decoder.decode(b'', final=True)
+                    if tail:
+                        yield tail
+                    return
+                yield decoder.decode(chunk)
+
+    def __iter__(self):
+        """逐段产出文件内容（按空行分段）"""
+        buffer = ''
+        for text in self._iter_text():
+            buffer += text
+            pos = 0
+            # 缓冲区末尾的空白可能与下一块组成更长的分隔符，落在其中的分隔留到下一轮处理
+            content_end = len(buffer.rstrip())
+            for match in _PARAGRAPH_BREAK_RE.finditer(buffer):
+                if match.end() >= content_end:
+                    break
+                yield buffer[pos:match.start()]
+                pos = match.end()
+            buffer = buffer[pos:]
+            while len(buffer) > self.MAX_PARAGRAPH_CHARS:
+                limit = self.MAX_PARAGRAPH_CHARS
+                cut = buffer.rfind('\n', 0, limit)
+                if cut <= 0:
+                    cut = buffer.rfind(' ', 0, limit)
+                if cut <= 0:
+                    cut = limit
+                yield buffer[:cut]
+                buffer = buffer[cut:]
+        if buffer:
+            yield from _PARAGRAPH_BREAK_RE.split(buffer)
+
+    def preview(self, max_chars):
+        """返回文件开头最多 max_chars 个字符，用于输入框预览"""
+        parts = []
+        length = 0
+        for text in self._iter_text():
+            parts.append(text)
+            length += len(text)
+            if length >= max_chars:
+                break
+        return _PARAGRAPH_BREAK_RE.sub('\n\n', ''.join(parts)[:max_chars])
+
+
+class MappedTextDocument:
+    """内存映射的大文件：打开时只扫描一遍段落边界，段落在需要显示时才解码"""
+    # 字节层面的段落分隔（适用于 UTF-8、GBK 等兼容 ASCII 的编码）
+    _BREAK_RE = re.compile(rb'\n\s*\n')
+    # 每个段落对应界面中的一个显示项，超长段落按显示项的大小切分（字节数不少于字符数）
+    MAX_PARAGRAPH_BYTES = RENDER_ITEM_CHARS
+
+    def __init__(self, filepath, encoding=None):
+        self.filepath = filepath
+        self.encoding = encoding or detect_encoding(filepath) or 'utf-8'
+        self._file = open(filepath, 'rb')
+        self._map = None
+        self.starts = array('Q')
+        self.ends = array('Q')
+        try:
+            if os.path.getsize(filepath) > 0:
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                self._scan()
+        except Exception:
+            self.close()
+            raise
+
+    def _scan(self):
+        """扫描段落边界，只记录偏移"""
+        pos = 0
+        for match in self._BREAK_RE.finditer(self._map):
+            self._add_range(pos, match.start())
+            pos = match.end()
+        self._add_range(pos, len(self._map))
+
+    def _add_range(self, start, end):
+        """登记一个段落，超长段落尽量在换行或空格处切分"""
+        data = self._map
+        while end - start > self.MAX_PARAGRAPH_BYTES:
+            limit = start + self.MAX_PARAGRAPH_BYTES
+            cut = data.rfind(b'\n', start + 1, limit)
+            if cut < 0:
+                cut = data.rfind(b' ', start + 1, limit)
+            if cut < 0:
+                cut = self._char_boundary(start, limit)
+            self.starts.append(start)
+            self.ends.append(cut)
+            start = cut
+        if end > start:
+            self.starts.append(start)
+            self.ends.append(end)
+
+    def _char_boundary(self, start, cut):
+        """硬切分时把切分点退到字符边界上，被切开的多字节字符（UTF-8、GBK 等）留给下一段"""
+        piece = self._map[start:cut]
+        try:
+            piece.decode(self.encoding)
+        except UnicodeDecodeError as e:
+            if e.start > 0 and len(piece) - e.start < 4:
+                return start + e.start
+        except LookupError:
+            pass
+        return cut
+
+    def __len__(self):
+        return len(self.starts)
+
+    def paragraph(self, index):
+        """解码第 index 个段落"""
+        raw = self._map[self.starts[index]:self.ends[index]]
+        return raw.decode(self.encoding, errors='replace')
+
+    def close(self):
+        """释放映射和文件句柄"""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+
+class ProgressReporter:
+    """限速的进度通道：每秒最多 max_rate 次、且百分比变化至少 min_step 时才通知界面
+
+    on_update(百分比, 每秒段落数, 预计剩余秒数) 直接调用，调用方自行保证线程安全（如 @mainthread）。
+    """
+    MAX_RATE = 10
+    MIN_STEP = 1.0
+
+    def __init__(self, on_update, max_rate=MAX_RATE, min_step=MIN_STEP):
+        self.on_update = on_update
+        self.min_interval = 1.0 / max_rate
+        self.min_step = min_step
+        self.start_time = time.perf_counter()
+        self._last_time = None
+        self._last_percent = 0.0
+        self.updates = 0
+
+    def update(self, percent, done):
+        """报告进度（percent 为百分比，done 为已处理段落数），返回本次是否通知了界面"""
+        now = time.perf_counter()
+        if self._last_time is not None and (now - self._last_time < self.min_interval or
+                                            percent - self._last_percent < self.min_step):
+            return False
+        self._emit(now, percent, done)
+        return True
+
+    def finish(self, done):
+        """报告完成，不受限速影响"""
+        self._emit(time.perf_counter(), 100, done)
+
+    def _emit(self, now, percent, done):
+        elapsed = now - self.start_time
+        rate = done / elapsed if elapsed > 0 else 0.0
+        eta = elapsed * (100 - percent) / percent if 0 < percent < 100 else 0.0
+        self._last_time = now
+        self._last_percent = percent
+        self.updates += 1
+        self.on_update(percent, rate, eta)
+
+
+class BackgroundJob:
+    """后台任务：任务类别、去重键和协作式取消标志"""
+    def __init__(self, kind, key):
+        self.kind = kind
+        self.key = key
+        self.future = None
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        """请求取消，任务在下一个检查点（如段落之间）自行退出"""
+        self._cancelled.set()
+
+    def done(self):
+        return self.future is not None and self.future.done()
+
+
+class JobScheduler:
+    """在有界线程池上运行后台任务，同一类别只保留最新的一个
+
+    提交与正在运行的任务键相同时直接返回原任务（合并重复点击）；
+    键不同时取消旧任务，旧任务在检查点发现 job.cancelled 后退出，其结果不再写入界面。
+    """
+    MAX_WORKERS = 3
+
+    def __init__(self, max_workers=MAX_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._jobs = {}  # 类别 -> 最新任务
+        self._lock = threading.Lock()
+
+    def submit(self, kind, key, fn, *args):
+        """提交任务，fn(job, *args) 在工作线程中执行，返回 BackgroundJob"""
+        with self._lock:
+            current = self._jobs.get(kind)
+            if current is not None and not current.cancelled and not current.done():
+                if current.key == key:
+                    print(f"[调试] 合并重复的后台任务: {kind}")
+                    return current
+                current.cancel()
+            job = BackgroundJob(kind, key)
+            self._jobs[kind] = job
+            job.future = self._executor.submit(self._run, job, fn, args)
+            return job
+
+    @staticmethod
+    def _run(job, fn, args):
+        if job.cancelled:
+            return
+        try:
+            fn(job, *args)
+        except Exception as e:
+            print(f"后台任务 {job.kind} 出错: {e}")
+
+    def cancel(self, kind=None):
+        """取消指定类别（None 表示全部）的任务"""
+        with self._lock:
+            for job_kind, job in self._jobs.items():
+                if kind is None or job_kind == kind:
+                    job.cancel()
+
+    def shutdown(self):
+        """取消所有任务并释放线程池，不等待正在运行的任务"""
+        self.cancel()
+        self._executor.shutdown(wait=False)